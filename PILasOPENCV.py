@@ -9,13 +9,9 @@ try:
     gif2numpy_installed = True
 except:
     gif2numpy_installed = False
-try:
-    import numpy2gif
-    numpy2gif_installed = True
-except:
-    numpy2gif_installed = False
 
-import re, os, sys, tempfile
+import re, os, sys, tempfile, struct, mmap, heapq, threading
+import collections
 import numbers
 try:
     import mss
@@ -38,11 +34,42 @@ try:
 except:
     freetype_installed = False
 
+try:
+    from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+    futures_installed = True
+except:
+    futures_installed = False
+
 __author__ = 'imressed, bunkus'
-VERSION = "3.0"
+VERSION = "3.25"
 
 """
 Version history:
+3.25: ImageChops functions use the saturating cv2 arithmetic, keep the dtype, return an Image and take out=
+3.24: premultiplied alpha modes RGBa and La, converted with cv2 and kept by resize, filter, crop and composite, alpha_composite() of RGBa images needs no divide
+3.23: alpha_composite() is the Porter-Duff over operator for straight or premultiplied alpha, Image.alpha_composite() changes only the destination region in place
+3.22: paste() with a mask only blends the pasted box in place instead of the whole image
+3.21: composite() blends 8 bit and float images in a single cv2.blendLinear with one mask band and takes out=
+3.20: getextrema() with cv2.minMaxLoc, getbbox() returns PIL's box and stops at the first non-zero pixels, ImageStat.Stat added
+3.19: getcolors() counts packed color keys and stops as soon as there are more than maxcolors colors
+3.18: histogram() returns PIL's 256 bins per band with cv2.calcHist and supports mask and extrema
+3.17: ImageEnhance Brightness and Contrast work like PIL with a single lookup table, Color and Sharpness added
+3.16: point() maps images through lookup tables or functions with cv2.LUT, the tables are cached
+3.15: resize, convert, filter, rotate, transpose and transform take out= to write the result to an existing Image or array
+3.14: convert() finds the cheapest chain of conversions between all modes including 1, LA, CMYK, I and F
+3.13: mode detection, the color conversion flags and the mode descriptors are looked up in module level tables
+3.12: Image uses __slots__, size, mode, bands, dtype and n_frames are computed from the numpy image and always up to date
+3.11: crop(), copy() and convert() to the same mode share the pixels and copy them on the first change by paste, putpixel or ImageDraw
+3.10: open() takes size and box to crop and resize the image while decoding it, at a reduced resolution for JPEG and WebP
+3.9: video files are opened with cv2.VideoCapture as image sequences, frames are read when seek() is called
+3.8: gif images are written frame by frame with a shared color table, save_all and append_images accept generators
+3.7: gif frames are decoded on demand when seek() is called, recently used frames are cached
+3.6: open_many() decodes a batch of images on a pool of worker threads
+3.5: save() encodes in memory with cv2.imencode to file objects and BytesIO, keyword options like quality, optimize and progressive are passed to the encoder
+3.4: open(fl, mmap=True) memory maps uncompressed PGM, PPM and BMP files, frombuffer() returns views on the buffer
+3.3: open() accepts bytes, bytearray, memoryview, BytesIO and mmap objects and decodes them without copying
+3.2: draft() decodes JPEG and WebP images at reduced resolution, used by thumbnail()
+3.1: open() reads only the file header of JPEG, PNG, BMP, TIFF and WebP images, the pixels are decoded on first access or with load()
 3.0: Floodfill got an check if the seed point is outside the image, ImageDraw got new methods getim() and setim()
 2.9: New functions of ImageEnhance Brightness and Contrast implemented
 2.8: In case an image file does not exist which shall be opened there will be an exception raised
@@ -67,14 +94,15 @@ if sys.version[0] == "2":
     py3 = False
     basstring = basestring
     fil_object = file
+    import __builtin__ as builtins
     import cStringIO
     from operator import isNumberType as isNumberTyp
     from operator import isSequenceType as isSequenceTyp
 else:
     py3 = True
     basstring = str
+    import builtins
     from io import IOBase
-    import collections
     fil_object = IOBase
     def isNumberTyp(obj):
         return isinstance(obj, numbers.Number)
@@ -145,6 +173,15 @@ SAVE = {}
 SAVE_ALL = {}
 EXTENSION = {".bmp": "BMP", ".dib": "DIB", ".jpeg": "JPEG", ".jpg": "JPEG", ".jpe": "JPEG", ".jp2": "JPEG2000", ".png": "PNG",
              ".webp": "WEBP", ".pbm": "PBM", ".pgm": "PGM", ".ppm": "PPM", ".sr": "SR", ".ras": "RAS", ".tif": "TIFF", ".tiff": "TIFF", ".gif": "GIF"}
+# video containers which are opened as image sequences with cv2.VideoCapture
+VIDEO_EXTENSION = {".avi": "AVI", ".mp4": "MP4", ".m4v": "MP4", ".mov": "MOV", ".mkv": "MKV", ".webm": "WEBM",
+                   ".mpg": "MPEG", ".mpeg": "MPEG", ".wmv": "WMV", ".flv": "FLV"}
+# extension which selects the cv2 encoder of a format
+_FORMAT_EXTENSION = {}
+for _ext, _format in EXTENSION.items():
+    _FORMAT_EXTENSION.setdefault(_format, _ext)
+# tiff compression names of PIL mapped to the libtiff compression tags for IMWRITE_TIFF_COMPRESSION
+_TIFF_COMPRESSION = {None: 1, "raw": 1, "tiff_lzw": 5, "jpeg": 7, "tiff_adobe_deflate": 8, "tiff_deflate": 8, "packbits": 32773}
 CV2_FONTS = [cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_DUPLEX,  
 cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_COMPLEX_SMALL,  
 cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, cv2.FONT_HERSHEY_SCRIPT_COMPLEX]             
@@ -221,9 +258,387 @@ def _conv_type_shape(im):
         return (im.size[1], im.size[0], extra), typ
 
 MODES = sorted(_MODEINFO)
-# raw modes that may be memory mapped.  NOTE: if you change this, you
-# may have to modify the stride calculation in map.c too!
-_MAPMODES = ("L", "P", "RGBX", "RGBA", "CMYK", "I;16", "I;16L", "I;16B")
+# numpy layout of the modes, mode -> (channels, dtype)
+_MODE_LAYOUT = {
+    "1": (1, np.bool_),
+    "L": (1, np.uint8),
+    "LA": (2, np.uint8),
+    "P": (1, np.uint8),
+    "RGB": (3, np.uint8),
+    "RGBA": (4, np.uint8),
+    "RGBa": (4, np.uint8),
+    "La": (2, np.uint8),
+    "CMYK": (4, np.uint8),
+    "YCBCR": (3, np.uint8),
+    "LAB": (3, np.uint8),
+    "HSV": (3, np.uint8),
+    "I": (1, np.int32),
+    "I;16": (1, np.uint16),
+    "F": (1, np.float32),
+    }
+# mode of a numpy image, (channels, dtype) -> mode
+_LAYOUT_MODE = {
+    (1, np.dtype(np.bool_)): "1",
+    (1, np.dtype(np.uint8)): "L",
+    (2, np.dtype(np.uint8)): "LA",
+    (3, np.dtype(np.uint8)): "RGB",
+    (4, np.dtype(np.uint8)): "RGBA",
+    (1, np.dtype(np.int32)): "I",
+    (1, np.dtype(np.uint16)): "I;16",
+    (1, np.dtype(np.float32)): "F",
+    }
+# premultiplied modes, their numpy images have the layout of the straight alpha mode
+_PREMULTIPLIED = {"RGBa": "RGBA", "La": "LA"}
+# modes whose numpy images have the layout of another mode, an Image keeps their name,
+# name in the conversion tables -> name of the mode
+_NAMED_MODES = {"CMYK": "CMYK", "YCBCR": "YCbCr", "LAB": "LAB", "HSV": "HSV", "RGBa": "RGBa", "La": "La"}
+# cv2 color conversions between the modes, (from mode, to mode) -> flag
+_CONVERTING_FLAGS = {
+    ("RGBA", "RGBa"): cv2.COLOR_RGBA2mRGBA,
+    ("RGBa", "RGBA"): cv2.COLOR_mRGBA2RGBA,
+    ("L", "RGB"): cv2.COLOR_GRAY2BGR,
+    ("L", "RGBA"): cv2.COLOR_GRAY2BGRA,
+    ("RGB", "L"): cv2.COLOR_BGR2GRAY,
+    ("RGB", "LAB"): cv2.COLOR_BGR2LAB,
+    ("RGB", "HSV"): cv2.COLOR_BGR2HSV,
+    ("RGB", "YCBCR"): cv2.COLOR_BGR2YCR_CB,
+    ("RGB", "RGBA"): cv2.COLOR_BGR2BGRA,
+    ("RGBA", "L"): cv2.COLOR_BGRA2GRAY,
+    ("RGBA", "RGB"): cv2.COLOR_BGRA2BGR,
+    ("LAB", "RGB"): cv2.COLOR_LAB2BGR,
+    ("HSV", "RGB"): cv2.COLOR_HSV2BGR,
+    ("YCBCR", "RGB"): cv2.COLOR_YCR_CB2BGR,
+    }
+
+def _cast_step(depth, low=None, high=None):
+    "returns a conversion step which casts an image to depth, the values are clipped to low and high first"
+    def step(src, dst):
+        if low is not None:
+            src = np.clip(src, low, high)
+        if dst is None:
+            return src.astype(depth)
+        np.copyto(dst, src.reshape(dst.shape), casting="unsafe")
+        return dst
+    return step
+
+def _bilevel_to_l(src, dst):
+    return np.multiply(src.view(np.uint8), 255, out=dst)
+
+def _l_to_bilevel(src, dst):
+    # black and white with the threshold of Otsu's method, like the older versions of convert("1"),
+    # cv2 writes 0 and 1 to the bool image through a uint8 view
+    if dst is None:
+        dst = np.empty(src.shape[:2], dtype=np.bool_)
+    cv2.threshold(src, 128, 1, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst.view(np.uint8))
+    return dst
+
+def _la_to_l(src, dst):
+    if dst is None:
+        return src[:, :, 0].copy()
+    np.copyto(dst, src[:, :, 0])
+    return dst
+
+def _l_to_la(src, dst):
+    if dst is None:
+        dst = np.empty(src.shape[:2] + (2,), dtype=np.uint8)
+    dst[:, :, 0] = src.reshape(src.shape[:2])
+    dst[:, :, 1] = 255
+    return dst
+
+def _la_premultiply(src, dst):
+    l, a = cv2.split(src)
+    return cv2.merge((cv2.multiply(l, a, scale=1.0 / 255), a), dst=dst)
+
+def _la_unpremultiply(src, dst):
+    l, a = cv2.split(src)
+    return cv2.merge((cv2.divide(l, a, scale=255), a), dst=dst)
+
+def _la_to_rgba(src, dst):
+    dst = cv2.cvtColor(np.ascontiguousarray(src[:, :, 0]), cv2.COLOR_GRAY2BGRA, dst=dst)
+    dst[:, :, 3] = src[:, :, 1]
+    return dst
+
+def _rgba_to_la(src, dst):
+    if dst is None:
+        dst = np.empty(src.shape[:2] + (2,), dtype=np.uint8)
+    dst[:, :, 0] = cv2.cvtColor(src, cv2.COLOR_BGRA2GRAY)
+    dst[:, :, 1] = src[:, :, 3]
+    return dst
+
+def _rgb_to_cmyk(src, dst):
+    # channels C, M, Y, K with C = 255 - R, M = 255 - G, Y = 255 - B and K = 0 like PIL
+    if dst is None:
+        dst = np.empty(src.shape[:2] + (4,), dtype=np.uint8)
+    np.subtract(255, src[:, :, ::-1], out=dst[:, :, :3])
+    dst[:, :, 3] = 0
+    return dst
+
+def _cmyk_to_rgb(src, dst):
+    # R = 255 - min(255, C + K) like PIL, saturated by cv2.subtract
+    if dst is None:
+        dst = np.empty(src.shape[:2] + (3,), dtype=np.uint8)
+    np.subtract(255, src[:, :, 2::-1], out=dst)
+    return cv2.subtract(dst, cv2.merge([src[:, :, 3]] * 3), dst=dst)
+
+# conversions which cv2.cvtColor cannot do, (from mode, to mode) -> step(src, dst),
+# a step writes to the buffer dst if it is not None and returns the converted image
+_CONVERTING_STEPS = {
+    ("1", "L"): _bilevel_to_l,
+    ("L", "1"): _l_to_bilevel,
+    ("L", "I"): _cast_step(np.int32),
+    ("I", "L"): _cast_step(np.uint8, 0, 255),
+    ("L", "F"): _cast_step(np.float32),
+    ("F", "L"): _cast_step(np.uint8, 0, 255),
+    ("I", "F"): _cast_step(np.float32),
+    ("F", "I"): _cast_step(np.int32),
+    ("LA", "L"): _la_to_l,
+    ("L", "LA"): _l_to_la,
+    ("LA", "RGBA"): _la_to_rgba,
+    ("RGBA", "LA"): _rgba_to_la,
+    ("LA", "La"): _la_premultiply,
+    ("La", "LA"): _la_unpremultiply,
+    ("RGB", "CMYK"): _rgb_to_cmyk,
+    ("CMYK", "RGB"): _cmyk_to_rgb,
+    }
+_conversion_plans = {}
+_scratch = threading.local()
+
+def _conversion_plan(inst, mode):
+    """returns the cheapest list of (mode, cv2 flag or step) which converts an image of mode inst to mode,
+    a cv2.cvtColor costs 1 and a numpy step 2, so a single cv2 flag is used whenever there is one"""
+    key = (inst, mode)
+    if key in _conversion_plans:
+        return _conversion_plans[key]
+    edges = {}
+    for (src, dst), flag in _CONVERTING_FLAGS.items():
+        edges.setdefault(src, []).append((1, dst, flag))
+    for (src, dst), step in _CONVERTING_STEPS.items():
+        edges.setdefault(src, []).append((2, dst, step))
+    if inst not in edges:
+        raise ValueError('This image type can not be converted')
+    # dijkstra, the counter keeps the heap from comparing the plans
+    queue = [(0, 0, inst, [])]
+    done = set()
+    count = 1
+    while queue:
+        cost, _, node, plan = heapq.heappop(queue)
+        if node == mode:
+            _conversion_plans[key] = plan
+            return plan
+        if node in done:
+            continue
+        done.add(node)
+        for step_cost, dst, step in edges.get(node, ()):
+            if dst not in done:
+                heapq.heappush(queue, (cost + step_cost, count, dst, plan + [(dst, step)]))
+                count += 1
+    raise ValueError('You can not convert image to this type')
+
+def _scratch_buffer(slot, shape, mode):
+    "returns a buffer of the current thread for the intermediate images of a conversion, it is reused by the next conversions"
+    channels, depth = _MODE_LAYOUT[mode]
+    shape = shape[:2] if channels == 1 else shape[:2] + (channels,)
+    buffers = getattr(_scratch, "buffers", None)
+    if buffers is None:
+        buffers = _scratch.buffers = {}
+    buf = buffers.get(slot)
+    if buf is None or buf.shape != shape or buf.dtype != depth:
+        buf = buffers[slot] = np.empty(shape, dtype=depth)
+    return buf
+
+def _convert_plan(obj, plan, out=None):
+    """runs a conversion plan on the numpy image obj, the intermediate images go to the scratch buffers and the result to out.
+    Single band images of shape (h, w, 1) are worked on as (h, w)"""
+    result = out
+    if obj.ndim == 3 and obj.shape[2] == 1:
+        obj = obj[:, :, 0]
+    if out is not None and out.ndim == 3 and out.shape[2] == 1:
+        out = out[:, :, 0]
+    for i, (mode, step) in enumerate(plan):
+        dst = out if i == len(plan) - 1 else _scratch_buffer(i % 2, obj.shape, mode)
+        if dst is not None and i == len(plan) - 1:
+            channels, depth = _MODE_LAYOUT[mode]
+            if dst.dtype != depth or dst.shape[:2] != obj.shape[:2] or (dst.shape[2:] or (1,))[0] != channels:
+                # out does not fit, the caller gets a new array
+                dst = None
+        if isinstance(step, int):
+            obj = cv2.cvtColor(obj, step, dst=dst)
+        else:
+            obj = step(obj, dst)
+    if obj is out:
+        return result
+    return obj
+
+_bbox_block = 1 << 16
+
+def _first_nonzero(img, axis, reverse=False):
+    """returns the index of the first row (axis 0) or column (axis 1) of the numpy image img with a non-zero
+    value, or the last one if reverse, None if there is none.  The image is scanned in blocks of about
+    _bbox_block values from the edge inward, the scan stops at the first block with a non-zero value"""
+    n = img.shape[axis]
+    step = max(1, _bbox_block * n // max(img.size, 1))
+    for start in range(0, n, step):
+        stop = min(n, start + step)
+        lines = slice(n - stop, n - start) if reverse else slice(start, stop)
+        block = img[lines] if axis == 0 else img[:, lines]
+        found = np.flatnonzero(block.any(axis=tuple(i for i in range(block.ndim) if i != axis)))
+        if found.size:
+            return n - stop + int(found[-1]) if reverse else start + int(found[0])
+    return None
+
+def _bilevel(op, img, dst=None):
+    """runs the cv2 operation op(src, dst) on the 0 and 1 bytes of the bool image img and views the result as bool,
+    interpolated and fill values are limited to 1"""
+    result = op(img.view(np.uint8), None if dst is None else dst.view(np.uint8))
+    np.minimum(result, 1, out=result)
+    return result.view(np.bool_)
+
+def _encodable(img):
+    "returns the numpy image img in a dtype cv2 can encode, bilevel images as 0 and 255"
+    if img.dtype == np.bool_:
+        return img.view(np.uint8) * np.uint8(255)
+    return img
+
+def _bands(img):
+    "returns the bands of the numpy image img in the band order of PIL, the image is BGR(A)"
+    img = _encodable(img)
+    if img.ndim == 2:
+        return [img]
+    bands = list(cv2.split(img))
+    if len(bands) >= 3:
+        bands[0], bands[2] = bands[2], bands[0]
+    return bands
+
+def _band_extrema(img, mask=None):
+    "returns the (min, max) of each band of the numpy image img with cv2.minMaxLoc"
+    extrema = []
+    for band in _bands(img):
+        low, high = cv2.minMaxLoc(band, mask)[:2]
+        if band.dtype.kind in "iu":
+            low, high = int(low), int(high)
+        extrema.append((low, high))
+    return extrema
+
+_color_scan_chunk = 1 << 18
+
+def _count_colors(keys, bits, maxcolors):
+    """counts the distinct values of the 1d array keys, returns (values, counts) or None if there are more
+    than maxcolors values.  The first pixels are checked before all of them are counted, so images with
+    many colors return early.  Keys of up to 24 bits are counted with a single np.bincount if there are
+    at least as many keys as bins, otherwise the table would cost more than sorting the keys"""
+    if np.unique(keys[:_color_scan_chunk]).size > maxcolors:
+        return None
+    if bits is not None and bits <= 24 and keys.size >= 1 << bits:
+        counts = np.bincount(keys, minlength=1 << bits)
+        values = np.flatnonzero(counts)
+        counts = counts[values]
+        values = values.astype(keys.dtype)
+    else:
+        values, counts = np.unique(keys, return_counts=True)
+    if values.size > maxcolors:
+        return None
+    return values, counts
+
+_point_tables = collections.OrderedDict()
+_point_tables_size = 64
+_point_tables_lock = threading.Lock()
+
+def _point_table(lut, bands):
+    """returns the cv2.LUT table of shape (256, 1, bands) in BGR order for lut, a function which is called
+    for the values 0 to 255 of all bands or a sequence of 256 values per band, the last used tables are
+    kept keyed by the function or the values of the sequence"""
+    try:
+        key = (lut if callable(lut) else tuple(np.asarray(lut).ravel().tolist()), bands)
+        hash(key)
+    except TypeError:
+        key = None
+    with _point_tables_lock:
+        table = _point_tables.pop(key, None)
+        if table is not None:
+            # reinserted as the most recently used table
+            _point_tables[key] = table
+            return table
+    if callable(lut):
+        try:
+            # ufuncs and arithmetic evaluate the whole range at once
+            values = np.broadcast_to(np.asarray(lut(np.arange(256)), dtype=np.float64), (256,))
+        except (TypeError, ValueError):
+            values = np.array([lut(i) for i in range(256)], dtype=np.float64)
+        values = np.tile(values, bands)
+    else:
+        values = np.asarray(lut, dtype=np.float64).ravel()
+        if values.size != 256 * bands:
+            raise ValueError("wrong number of lut entries")
+    table = np.clip(np.round(values), 0, 255).astype(np.uint8).reshape(bands, 256).T
+    if bands >= 3:
+        table = table[:, [2, 1, 0] + list(range(3, bands))]
+    table = np.ascontiguousarray(table).reshape(256, 1, bands)
+    if key is not None:
+        with _point_tables_lock:
+            _point_tables[key] = table
+            if len(_point_tables) > _point_tables_size:
+                _point_tables.popitem(last=False)
+    return table
+
+def _get_channels_and_depth(mode):
+    "returns the number of channels and the dtype of the numpy image of mode"
+    try:
+        return _MODE_LAYOUT[str(mode).upper()]
+    except KeyError:
+        raise ValueError('Your mode name is incorrect.')
+
+def _mode_name(mode):
+    "returns the name of mode in the conversion tables, upper case except for the premultiplied modes RGBa and La"
+    mode = str(mode)
+    if mode in _PREMULTIPLIED:
+        return mode
+    return mode.upper()
+
+def _get_mode(shape, depth):
+    "returns the mode of a numpy image with shape and dtype depth, None for an unknown layout"
+    if len(shape) == 2:
+        channels = 1
+    else:
+        channels = shape[2]
+    return _LAYOUT_MODE.get((channels, np.dtype(depth)))
+
+def _new(mode, size, color=None):
+    "returns a numpy image of mode and size filled with color"
+    channels, depth = _get_channels_and_depth(mode)
+    _im = np.zeros((size[1], size[0], channels), depth)
+    if color is not None:
+        _im[:, 0:] = color
+    return _im
+
+# imread flags for Image.draft(), keyed by (mode, scale denominator)
+_DRAFT_FLAGS = {
+    ("RGB", 1): cv2.IMREAD_COLOR,
+    ("RGB", 2): cv2.IMREAD_REDUCED_COLOR_2,
+    ("RGB", 4): cv2.IMREAD_REDUCED_COLOR_4,
+    ("RGB", 8): cv2.IMREAD_REDUCED_COLOR_8,
+    ("L", 1): cv2.IMREAD_GRAYSCALE,
+    ("L", 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    ("L", 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    ("L", 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }
+# raw modes that may be memory mapped, mapped to (typestr, bands in the buffer).
+# The numpy image is a view on the buffer, RGB data is viewed with reversed bands
+# and the padding byte of RGBX/BGRX data is left out of the view.
+_MAPMODES = {
+    "L": ('|u1', 1),
+    "P": ('|u1', 1),
+    "RGB": ('|u1', 3),
+    "BGR": ('|u1', 3),
+    "RGBX": ('|u1', 4),
+    "BGRX": ('|u1', 4),
+    "BGRA": ('|u1', 4),
+    "CMYK": ('|u1', 4),
+    "I": (_ENDIAN + 'i4', 1),
+    "F": (_ENDIAN + 'f4', 1),
+    "I;16": ('<u2', 1),
+    "I;16L": ('<u2', 1),
+    "I;16B": ('>u2', 1),
+    }
 
 if bitmap_classes_ok:
     try:
@@ -468,180 +883,207 @@ class ImageTransformHandler:
     pass
 
 class Image(object):
-    
-    def __init__(self, image=None, filename=None, format=None, instances=[], exts=[], image_specs={}):
+    # size, mode, bands and dtype are computed from the numpy image or the file header
+    __slots__ = ("_loader", "_array", "_shared", "_header", "_frame_nr", "filename", "format",
+                 "frames", "exts", "image_specs", "palette", "readonly", "pyaccess", "_color_mode")
+
+    def __init__(self, image=None, filename=None, format=None, instances=None, exts=None, image_specs=None):
+        self._loader = None
+        self._header = None
+        # name of the mode if the numpy layout does not tell it, CMYK, YCbCr, LAB, HSV, RGBa or La
+        self._color_mode = None
         self._instance = image
         self.filename = filename
         self.format = format
-        self.frames = instances
-        self.n_frames = len(self.frames)
-        if self.n_frames>1:
-            self.is_animated = True
-        else:
-            self.is_animated = False
+        self.frames = [] if instances is None else instances
         self._frame_nr = 0
-        self.exts = exts
-        self.image_specs = image_specs
-        self._mode = None
-        if image is not None or filename is not None:
-            if self.filename is not None:
-                ext = os.path.splitext(self.filename)[1]
-                self.format = EXTENSION[ext]
-            if self._instance is not None:
-                self.size = (self._instance.shape[1], self._instance.shape[0])
-                if len(self._instance.shape)>2:
-                    self.layers = self.bands = self._instance.shape[2]
-                else:
-                    self.layers = self.bands = 1
-                self.dtype = self._instance.dtype
-                if self.dtype == np.uint8:
-                    self.bits = 8
-                self._mode = self._get_mode(self._instance.shape, self.dtype)
+        self.exts = [] if exts is None else exts
+        self.image_specs = {} if image_specs is None else image_specs
+        self.palette = None
+        self.readonly = 0
+        self.pyaccess = None
+        if self.filename is not None:
+            ext = os.path.splitext(self.filename)[1].lower()
+            self.format = EXTENSION.get(ext, self.format)
+
+    @property
+    def _instance(self):
+        "the numpy image, decoded from the file on first access if it was opened lazily"
+        if self._loader is not None:
+            self.load()
+        return self._array
+
+    @_instance.setter
+    def _instance(self, image):
+        self._loader = None
+        self._shared = False
+        self._array = image
+
+    def _share(self, im):
+        "marks im and this image as sharing their buffer, each of them is copied before it is changed in place"
+        self._shared = im._shared = True
+        return im
+
+    def _make_writable(self):
+        """returns the numpy image to change it in place, it is copied first if its buffer is shared
+        with a crop or copy of the image or if it is a read-only view on a file or buffer"""
+        if self._shared or not self._instance.flags.writeable:
+            self._instance = self._instance.copy()
+            # the image owns the copy
+            self.readonly = 0
+        return self._array
+
+    def _like(self, image):
+        "returns an Image of the numpy image in the mode of this image if the layout matches"
+        im = Image(image)
+        im._color_mode = self._color_mode
+        return im
+
+    def _output(self, out, op, inplace=False):
+        """returns the Image of op(dst) which computes the result of an operation into the numpy array dst
+        or a new array if dst is None.  dst is the buffer of out, an Image or a numpy array, if it is
+        given.  The result goes through a temporary array if dst shares memory with this image and
+        the operation cannot work in place, or if op does not write to dst."""
+        if out is None:
+            return self._like(op(None))
+        dst = out._make_writable() if isinstance(out, Image) else out
+        if not inplace and np.may_share_memory(dst, self._instance):
+            result = op(None)
         else:
-            self._mode = None
-            self.size = (0, 0)
-            self.dtype = None
-        self.mode = self._mode
-
-    # @property
-    # def size(self):
-    #     return self._instance.shape[:2][::-1]
+            result = op(dst)
+        if result is not dst and result.shape == dst.shape and result.dtype == dst.dtype:
+            np.copyto(dst, result)
+            result = dst
+        if isinstance(out, Image):
+            if result is not dst:
+                out._instance = result
+            out._color_mode = self._color_mode
+            return out
+        if result is not dst:
+            raise ValueError("out does not match the shape and dtype of the result", result.shape, result.dtype)
+        return self._like(out)
+
+    def _set_loader(self, source, header, flags=cv2.IMREAD_UNCHANGED, region=None):
+        """defers decoding of source (a filename or a numpy buffer of encoded bytes) until the
+        pixel data is accessed, header is the (format, size, channels, dtype) tuple of _read_header
+        and region the (box, size, filtermethod) which the decoded image is cropped and resized to"""
+        fmt, size, channels, dtype = header
+        if channels == 1:
+            shape = (size[1], size[0])
+        else:
+            shape = (size[1], size[0], channels)
+        # the format read from the header wins over the one guessed from the file extension
+        if fmt is not None:
+            self.format = fmt
+        self._array = None
+        self._header = (shape, np.dtype(dtype))
+        self._loader = (source, flags, region)
+
+    def load(self):
+        """
+        Allocates storage for the image and loads the pixel data.  In
+        normal cases, you don't need to call this method, since the
+        Image class automatically loads an opened image when it is
+        accessed the first time.
 
-    # @property
-    # def width(self):
-    #     return self._instance.shape[1]
+        :returns: The numpy image.
+        :exception IOError: If the image data could not be decoded.
+        """
+        if self._loader is not None:
+            source, flags, region = self._loader
+            if isinstance(source, basstring):
+                _instance = cv2.imread(source, flags)
+            else:
+                _instance = cv2.imdecode(source, flags)
+            if _instance is None:
+                raise IOError("cannot decode image file", self.filename)
+            if region is not None:
+                _instance = _crop_resize(_instance, *region)
+            self._instance = _instance
+        return self._array
+
+    def _specs(self):
+        "returns shape and dtype of the numpy image, taken from the file header if it has not been decoded yet"
+        if self._loader is not None:
+            return self._header
+        if self._array is None:
+            return (0, 0), None
+        return self._array.shape, self._array.dtype
+
+    @property
+    def size(self):
+        shape = self._specs()[0]
+        return (shape[1], shape[0])
+
+    @property
+    def width(self):
+        return self._specs()[0][1]
+
+    @property
+    def height(self):
+        return self._specs()[0][0]
+
+    @property
+    def mode(self):
+        shape, dtype = self._specs()
+        if dtype is None:
+            return None
+        mode = self._get_mode(shape, dtype)
+        if self._color_mode is not None:
+            channels, depth = _MODE_LAYOUT[_mode_name(self._color_mode)]
+            if _LAYOUT_MODE[(channels, np.dtype(depth))] == mode:
+                return self._color_mode
+        return mode
+
+    _mode = mode
+
+    @property
+    def bands(self):
+        shape = self._specs()[0]
+        if len(shape)>2:
+            return shape[2]
+        return 1
+
+    layers = bands
+
+    @property
+    def dtype(self):
+        return self._specs()[1]
+
+    @property
+    def bits(self):
+        dtype = self._specs()[1]
+        if dtype is None:
+            return None
+        return np.dtype(dtype).itemsize * 8
 
-    # @property
-    # def height(self):
-    #     return self._instance.size[0]
+    @property
+    def n_frames(self):
+        return len(self.frames)
 
-    # @property
-    # def mode(self):
-    #     if self._mode:
-    #         return self._mode
-    #     else:
-    #         raise ValueError('No mode specified.')
+    @property
+    def is_animated(self):
+        return len(self.frames) > 1
 
-    # @property
-    # def shape(self):
-    #     return self._instance.shape
+    @property
+    def shape(self):
+        return self._specs()[0]
 
     # @property
     # def get_instance(self):
     #     return self._instance
 
     def _get_channels_and_depth(self, mode):
-        mode = str(mode).upper()
-        if mode == '1':
-            return 1 , np.bool
-        if mode == 'L':
-            return 1, np.uint8
-        if mode == 'LA':
-            return 2, np.uint8
-        if mode == 'P':
-            return 1, np.uint8
-        if mode == 'RGB':
-            return 3, np.uint8
-        if mode == 'RGBA':
-            return 4, np.uint8
-        if mode == 'CMYK':
-            return 4, np.uint8
-        if mode == 'YCBCR':
-            return 3, np.uint8
-        if mode == 'LAB':
-            return 3, np.uint8
-        if mode == 'HSV':
-            return 3, np.uint8
-        if mode == 'I':
-            return 1, np.int32
-        if mode == 'F':
-            return 1, np.float32
-
-        raise ValueError('Your mode name is incorrect.')
-
-    def _get_converting_flag(self, mode, inst=None):
-        "returns the cv2 flag for color conversion from inst to mode, uses the mode of the image object by default"
-        mode = mode.upper()
-        if inst is None:
-            inst = self._mode.upper()
-        if mode == inst:
-            return "EQUAL"
-        converting_table = {
-            'L':{
-                'RGB':cv2.COLOR_GRAY2BGR,
-                'RGBA':cv2.COLOR_GRAY2BGRA
-            },
-            'RGB':{
-                '1':cv2.COLOR_BGR2GRAY,
-                'L':cv2.COLOR_BGR2GRAY,
-                'LAB':cv2.COLOR_BGR2LAB,
-                'HSV':cv2.COLOR_BGR2HSV,
-                'YCBCR':cv2.COLOR_BGR2YCR_CB,
-                'RGBA':cv2.COLOR_BGR2BGRA
-            },
-            'RGBA':{
-                '1':cv2.COLOR_BGRA2GRAY,
-                'L':cv2.COLOR_BGRA2GRAY,
-                'RGB':cv2.COLOR_BGRA2BGR
-            },
-            'LAB':{
-                'RGB':cv2.COLOR_LAB2BGR
-            },
-            'HSV':{
-                'RGB':cv2.COLOR_HSV2BGR
-            },
-            'YCBCR':{
-                'RGB':cv2.COLOR_YCR_CB2BGR
-            }
-        }
-        if inst in converting_table:
-            if mode in converting_table[inst]:
-                return converting_table[inst][mode]
-            else:
-                raise ValueError('You can not convert image to this type')
-        else:
-            raise ValueError('This image type can not be converted')
+        return _get_channels_and_depth(mode)
 
     def _get_mode(self, shape, depth):
-        if len(shape) == 2:
-            channels = 1
-        else:
-            channels = shape[2]
-        if channels == 1 and depth == np.bool:
-            return '1'
-        if channels == 1 and depth == np.uint8:
-            return 'L'
-        if channels == 1 and depth == np.uint8:
-            return 'P'
-        if channels == 2 and depth == np.uint8:
-            return 'LA'
-        if channels == 3 and depth == np.uint8:
-            return 'RGB'
-        if channels == 4 and depth == np.uint8:
-            return 'RGBA'
-        if channels == 4 and depth == np.uint8:
-            return 'CMYK'
-        if channels == 3 and depth == np.uint8:
-            return 'YCBCR'
-        if channels == 3 and depth == np.uint8:
-            return 'LAB'
-        if channels == 3 and depth == np.uint8:
-            return 'HSV'
-        if channels == 1 and depth == np.int32:
-            return 'I'
-        if channels == 1 and depth == np.float32        :
-            return 'F'
+        return _get_mode(shape, depth)
 
     def _new(self, mode, size, color=None):
-        self._mode = mode
-        channels, depth = self._get_channels_and_depth(mode)
-        size = size[::-1]
-        self._instance = np.zeros(size + (channels,), depth)
-        if color is not None:
-            self._instance[:, 0:] = color
+        self._instance = _new(mode, size, color)
         return self._instance
 
-    def alpha_composite(self, im, dest=(0, 0), source=(0, 0)):
+    def alpha_composite(self, im, dest=(0, 0), source=(0, 0), premultiplied=False):
         """ 'In-place' analog of Image.alpha_composite. Composites an image
         onto this image.
 
@@ -651,8 +1093,11 @@ class Image(object):
         :param source: Optional 2 (left, top) tuple for the upper left
           corner in the overlay source image, or 4 tuple (left, top, right,
           bottom) for the bounds of the source rectangle
+        :param premultiplied: Optional flag, the colors of both images are
+          premultiplied with their alpha.  It is set for RGBa images, an
+          overlay of the other mode is converted to the mode of this image
 
-        Performance Note: Not currently implemented in-place in the core layer.
+        Only the region of this image under the overlay is changed.
         """
 
         if not isinstance(source, (list, tuple)):
@@ -668,45 +1113,44 @@ class Image(object):
         if min(dest) < 0:
             raise ValueError("Destination must be non-negative")
 
-        channels, depth = self._get_channels_and_depth(im)
-        _mode = self._get_mode(im.shape, im.dtype)
-        _im = self._new(_mode, (im.shape[1], im.shape[0]))
+        if self.mode not in ("RGBA", "RGBa") or im.mode not in ("RGBA", "RGBa"):
+            raise ValueError("image has wrong mode")
         if len(source) == 2:
-            source = source + _im.size
+            source = tuple(source) + im.size
 
         # over image, crop if it's not the whole thing.
-        if source == (0, 0) + _im.size:
-            overlay = _im
-        else:
-            overlay = _im.crop(source)
-
-        # target for the paste
-        box = dest + (dest[0] + overlay.width, dest[1] + overlay.height)
-
-        # destination image. don't copy if we're using the whole image.
-        if box == (0, 0) + self.size:
-            background = self._instance
-        else:
-            background = self.crop(box)
-
-        result = alpha_composite(background, overlay)
-        self.paste(result, box)
+        overlay = im.crop(source)
+        if self.mode == "RGBa":
+            # premultiplied images are composited without dividing by alpha
+            premultiplied = True
+        if overlay.mode != self.mode:
+            overlay = overlay.convert(self.mode)
+        overlay = overlay._instance
+
+        # only the part of this image under the overlay is changed
+        region = _paste_region(self._instance.shape, overlay.shape, dest[0], dest[1])
+        if region is not None:
+            _alpha_over(self._make_writable()[region[0]], overlay[region[1]], premultiplied)
 
     def crop(self, box, image=None):
-        "crops the image to the box which is a tuple = left, upper, right, lower"
+        "crops the image to the box which is a tuple = left, upper, right, lower, the crop is a view which is copied when it or the image is changed"
         if image is None:
             part = self._instance[box[1]:box[3], box[0]:box[2]]
-            return Image(part)
+            return self._share(self._like(part))
         else:
             image = image[box[1]:box[3], box[0]:box[2]]
             return image
 
     def copy(self):
-        "returns a deep copy of the original"
-        return Image(self._instance.copy(), format=self.format)
+        "returns a copy of the original, the buffer is copied when the copy or the original is changed"
+        im = self._share(self._like(self._instance))
+        im.format = self.format
+        return im
 
     def close(self):
-        "closes all opened windows"
+        "closes all opened windows and releases the video file of the frames"
+        if isinstance(self.frames, _VideoFrames):
+            self.frames.close()
         cv2.destroyAllWindows()
         return None
 
@@ -725,10 +1169,62 @@ class Image(object):
         Note: This method is not implemented for most images. It is
         currently implemented only for JPEG and PCD images.
 
-        :param mode: The requested mode.
+        Here it is implemented for JPEG and WebP images which have been
+        opened but not loaded yet.  cv2 decodes them at 1/2, 1/4 or 1/8
+        of the resolution, the largest reduction is chosen which still
+        gives an image not smaller than the requested size.
+
+        :param mode: The requested mode, "L" decodes a greyscale image.
         :param size: The requested size.
         """
-        pass
+        if self._loader is None or self._loader[2] is not None or self.format not in ("JPEG", "WEBP"):
+            return
+        if mode is None:
+            mode = self._mode
+        if mode not in ("L", "RGB") or self._mode not in ("L", "RGB", "RGBA"):
+            return
+        if size is None:
+            size = self.size
+        scale = 1
+        for reduction in (8, 4, 2):
+            if self.size[0]//reduction >= size[0] and self.size[1]//reduction >= size[1]:
+                scale = reduction
+                break
+        if scale == 1 and mode == self._mode:
+            return
+        source = self._loader[0]
+        flags = _DRAFT_FLAGS[(mode, scale)] | cv2.IMREAD_IGNORE_ORIENTATION
+        self._set_loader(source, (self.format, _reduced_size(self.format, self.size, scale), 1 if mode == "L" else 3, np.uint8), flags)
+
+    def _set_region(self, size, box, filtermethod):
+        """crops the image to box and resizes it to size, if the image has not been loaded yet this is done
+        when it is decoded and JPEG and WebP images are decoded at a reduced resolution if possible"""
+        if box is None:
+            box = (0, 0) + tuple(self.size)
+        box = tuple(int(round(c)) for c in box)
+        crop_size = (box[2]-box[0], box[3]-box[1])
+        size = crop_size if size is None else (int(size[0]), int(size[1]))
+        if self._loader is None:
+            self._instance = _crop_resize(self._instance, box, size, filtermethod)
+            return
+        source, flags, region = self._loader
+        scale = 1
+        if self.format in ("JPEG", "WEBP") and self._mode in ("L", "RGB") and flags == cv2.IMREAD_UNCHANGED:
+            for reduction in (8, 4, 2):
+                if crop_size[0]//reduction >= size[0] and crop_size[1]//reduction >= size[1]:
+                    scale = reduction
+                    break
+        if scale > 1:
+            flags = _DRAFT_FLAGS[(self._mode, scale)] | cv2.IMREAD_IGNORE_ORIENTATION
+            width, height = _reduced_size(self.format, self.size, scale)
+            right, lower = -(-box[2]//scale), -(-box[3]//scale)
+            # a box inside the image stays inside the reduced image, the parts outside are padded
+            if box[2] <= self.size[0]:
+                right = min(right, width)
+            if box[3] <= self.size[1]:
+                lower = min(lower, height)
+            box = (box[0]//scale, box[1]//scale, right, lower)
+        self._set_loader(source, (self.format, size, self.bands, self.dtype), flags, (box, size, filtermethod))
 
     def frombytes(self, mode, size, data, decoder_name="raw", *args):
         """
@@ -746,7 +1242,7 @@ class Image(object):
 
         # unpack data
         channels, depth = self._get_channels_and_depth(mode)
-        self._instance = np.fromstring(data, dtype=depth)
+        self._instance = np.frombuffer(data, dtype=depth)
         try:
             self._instance = self._instance.reshape((size[1], size[0], channels))
         except:
@@ -766,10 +1262,17 @@ class Image(object):
         #                           "Please call frombytes() instead.")
         self.frombytes(mode, size, data, decoder_name, *args)
 
-    def convert(self, mode):
-        "converts an image to the given mode"
-        if self._mode.upper() == mode.upper():
-            return Image(self._instance.copy())
+    def convert(self, mode, out=None):
+        """converts an image to the given mode, the result is written to out (an Image or a numpy array)
+        if it is given"""
+        if out is not None:
+            if _mode_name(mode) == _mode_name(self._mode):
+                return self._output(out, lambda dst: self._instance, inplace=True)
+            out = self._output(out, lambda dst: self._convert(mode, dst=dst))
+            out._color_mode = _NAMED_MODES.get(_mode_name(mode))
+            return out
+        if _mode_name(self._mode) == _mode_name(mode):
+            return self._share(self._like(self._instance))
         if not mode and self.mode == "P":
             # determine default mode
             if self.palette:
@@ -777,24 +1280,23 @@ class Image(object):
             else:
                 mode = "RGB"
         if not mode or (mode == self.mode):
-            return Image(self._instance.copy())
-        return Image(self._convert(mode))
+            return self._share(self._like(self._instance))
+        im = Image(self._convert(mode))
+        im._color_mode = _NAMED_MODES.get(_mode_name(mode))
+        return im
         
-    def _convert(self, mode, obj=None):
+    def _convert(self, mode, obj=None, inst=None, dst=None):
+        """converts the numpy image obj of mode inst to mode along the cheapest path of cv2.cvtColor
+        and numpy steps, obj defaults to the image and inst to the mode of obj, the result is written
+        to the numpy array dst if it fits"""
+        if inst is None:
+            inst = self.mode if obj is None else self._get_mode(obj.shape, obj.dtype)
         if obj is None:
             obj = self._instance
-            flag = self._get_converting_flag(mode)
-        else:
-            orig_mode = self._get_mode(obj.shape, obj.dtype)
-            flag = self._get_converting_flag(mode, inst=orig_mode)
-        if flag == "EQUAL":
+        mode, inst = _mode_name(mode), _mode_name(inst)
+        if mode == inst:
             return obj.copy()
-        if mode == "1":
-            im_gray = cv2.cvtColor(obj, cv2.COLOR_BGR2GRAY)
-            thresh, converted = cv2.threshold(im_gray, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-        else:
-            converted = cv2.cvtColor(obj, flag)
-        return converted
+        return _convert_plan(obj, _conversion_plan(inst, mode), dst)
 
     def paste(self, img_color, box=None, mask=None):
         "pastes either an image or a color to a region of interest defined in box with a mask"
@@ -819,57 +1321,35 @@ class Image(object):
                 raise ValueError("cannot determine region size; use 4-item box")
             img_dim = (box[3]-box[1]+1, box[2]-box[0]+1)
             channels, depth = self._get_channels_and_depth(self._mode)
-            colorbox = np.zeros((img_dim[0], img_dim[1], channels), dtype=depth)
+            colorbox = np.zeros(img_dim + self._instance.shape[2:], dtype=depth)
             colorbox[:] = img_color
-            _img_color = colorbox.copy()
+            _img_color = colorbox
         if mask is None:
-            self._instance = self._paste(self._instance, _img_color, box[0], box[1])
+            self._instance = self._paste(self._make_writable(), _img_color, box[0], box[1])
         else:
-            # enlarge the image _img_color without resizing to the new_canvas
-            new_canvas = np.zeros(self._instance.shape, dtype=self._instance.dtype)
-            new_canvas = self._paste(new_canvas, _img_color, box[0], box[1])
-            if len(mask._instance.shape) == 3:
-                if mask._instance.shape[2] == 4: # RGBA
-                    r, g, b, _mask = self.split(mask)
-                elif mask._instance.shape[2] == 1:
-                    _mask = mask._instance.copy()
-            else:
-                _mask = mask._instance.copy()
-            
-            if _mask.shape[:2] != new_canvas.shape[:2]:
-                _new_mask = np.zeros(self._instance.shape[:2], dtype=self._instance.dtype)
-                _new_mask = ~(self._paste(_new_mask, _mask, box[0], box[1]))
+            # only the part of the image under the pasted box is blended
+            _mask = _mask_band(mask)
+            if _mask.shape[:2] == self._instance.shape[:2] and _mask.shape[:2] != _img_color.shape[:2]:
+                # a mask of the size of the image
+                region = _paste_region(self._instance.shape, _img_color.shape, box[0], box[1])
+                mask_region = region and region[0]
             else:
-                _new_mask = ~_mask
-            self._instance = composite(self._instance, new_canvas, _new_mask, np_image=True)
+                # the mask is pasted at the box like the image, the part covered by both is blended
+                shape = (min(_img_color.shape[0], _mask.shape[0]), min(_img_color.shape[1], _mask.shape[1]))
+                region = _paste_region(self._instance.shape, shape, box[0], box[1])
+                mask_region = region and region[1]
+            if region is None:
+                return
+            dst = self._make_writable()[region[0]]
+            result = _blend_masked(_img_color[region[1]], dst, _mask[mask_region], dst=dst)
+            if result is not dst:
+                dst[...] = result
 
     def _paste(self, mother, child, x, y):
         "Pastes the numpy image child into the numpy image mother at position (x, y)"
-        size = mother.shape
-        csize = child.shape
-        if y+csize[0]<0 or x+csize[1]<0 or y>size[0] or x>size[1]: return mother
-        sel = [int(y), int(x), csize[0], csize[1]]
-        csel = [0, 0, csize[0], csize[1]]
-        if y<0:
-            sel[0] = 0
-            sel[2] = csel[2] + y
-            csel[0] = -y
-        elif y+sel[2]>=size[0]:
-            sel[2] = int(size[0])
-            csel[2] = size[0]-y
-        else:
-            sel[2] = sel[0] + sel[2]
-        if x<0:
-            sel[1] = 0
-            sel[3] = csel[3] + x
-            csel[1] = -x
-        elif x+sel[3]>=size[1]:
-            sel[3] = int(size[1])
-            csel[3] = size[1]-x
-        else:
-            sel[3] = sel[1] + sel[3]
-        childpart = child[csel[0]:csel[2], csel[1]:csel[3]]
-        mother[sel[0]:sel[2], sel[1]:sel[3]] = childpart
+        region = _paste_region(mother.shape, child.shape, x, y)
+        if region is not None:
+            mother[region[0]] = child[region[1]]
         return mother
 
     def _scaleTo8Bit(self, image, div, displayMin=None, displayMax=None):
@@ -889,21 +1369,25 @@ class Image(object):
         # print(kernel)
         return kernel
 
-    def filter(self, filtermethod):
-        "Filters this image using the given filter."
+    def filter(self, filtermethod, out=None):
+        """Filters this image using the given filter.  The result is written to out (an Image or a
+        numpy array) if it is given, out can be the image itself."""
         if filtermethod.name == "GaussianBlur":
-            return GaussianBlur().filter(self)
+            if out is None:
+                return self._like(GaussianBlur().filter(self)._instance)
+            return self._output(out, lambda dst: GaussianBlur().filter(self)._instance, inplace=True)
         fa = filtermethod.filterargs
-        if filtermethod == EMBOSS:
-            _im = self._instance.astype(np.float32)
-            _im = cv2.filter2D(_im, -1, self._filter_kernel(fa))
-            _im = self._scaleTo8Bit(_im, fa[2])
-        elif filtermethod == CONTOUR:
-            _im = cv2.filter2D(self._instance, -1, self._filter_kernel(fa))
-            _im = ~_im
-        else:
-            _im = cv2.filter2D(self._instance, -1, self._filter_kernel(fa))
-        return Image(_im)
+        def op(dst):
+            if filtermethod == EMBOSS:
+                _im = self._instance.astype(np.float32)
+                _im = cv2.filter2D(_im, -1, self._filter_kernel(fa))
+                return self._scaleTo8Bit(_im, fa[2])
+            _im = cv2.filter2D(self._instance, -1, self._filter_kernel(fa), dst=dst)
+            if filtermethod == CONTOUR:
+                _im = np.invert(_im, out=_im)
+            return _im
+        # cv2.filter2D can work in place
+        return self._output(out, op, inplace=True)
 
     def getband(self, channel):
         channels, depth = self._get_channels_and_depth(self._mode)
@@ -914,24 +1398,36 @@ class Image(object):
             return chs[channel]
 
     def getbands(self):
+        if self._mode in _MODEINFO:
+            return _MODEINFO[self._mode][2]
         return tuple([i for i in self._mode])
 
-    def getbbox(self):
+    def getbbox(self, alpha_only=True):
         """
         Calculates the bounding box of the non-zero regions in the
-        image.
+        image.  The image is scanned from the edges inward and the scan
+        stops at the first non-zero rows and columns.
+
+        :param alpha_only: Optional flag, defaulting to ``True``.
+           If ``True`` and the image has an alpha channel, trim transparent pixels.
+           Otherwise, trim pixels when all channels are zero.
 
         :returns: The bounding box is returned as a 4-tuple defining the
            left, upper, right, and lower pixel coordinate. See
            :ref:`coordinate-system`. If the image is completely empty, this
            method returns None.
         """
-        img_ = (self._instance > 0)
-        rows = np.any(img_, axis=1)
-        cols = np.any(img_, axis=0)
-        rmin, rmax = np.argmax(rows), img_.shape[0] - 1 - np.argmax(np.flipud(rows))
-        cmin, cmax = np.argmax(cols), img_.shape[1] - 1 - np.argmax(np.flipud(cols))
-        return (rmin, rmax, cmin, cmax)
+        img = self._instance
+        if alpha_only and self.mode in ("LA", "RGBA", "La", "RGBa"):
+            img = img[..., -1]
+        top = _first_nonzero(img, 0)
+        if top is None:
+            return None
+        bottom = _first_nonzero(img, 0, reverse=True)
+        img = img[top:bottom + 1]
+        left = _first_nonzero(img, 1)
+        right = _first_nonzero(img, 1, reverse=True)
+        return (left, top, right + 1, bottom + 1)
 
     def _getcolors(self):
         channels, depth = self._get_channels_and_depth(self._mode)
@@ -965,7 +1461,7 @@ class Image(object):
         """
 
         if self._mode in ("1", "L", "P"):
-            h = self._instance.histogram()
+            h = self.histogram()
             out = []
             for i in range(256):
                 if h[i]:
@@ -973,12 +1469,38 @@ class Image(object):
             if len(out) > maxcolors:
                 return None
             return out
-        uni, counts = self._getcolors()
-        if c>maxcolors: return None
-        colors = []
-        for l in range(len(counts)):
-            colors.append((counts[l], l))
-        return colors
+        img = self._instance
+        if img.ndim == 2:
+            # I and F images
+            colors = _count_colors(img.ravel(), None, maxcolors)
+            if colors is None:
+                return None
+            return list(zip(colors[1].tolist(), colors[0].tolist()))
+        channels = img.shape[2]
+        if channels == 2:
+            keys, bits = np.ascontiguousarray(img).view(np.uint16).ravel(), 16
+        elif channels == 3:
+            # B, G, R and a zero byte make one little endian uint32 key 0xRRGGBB
+            keys = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA).view(np.uint32).ravel()
+            keys &= 0xFFFFFF
+            bits = 24
+        else:
+            keys, bits = np.ascontiguousarray(img).view(np.uint32).ravel(), 32
+            alpha = cv2.minMaxLoc(img[..., 3])
+            if alpha[0] == alpha[1]:
+                # a constant alpha band is left out of the keys
+                keys, bits = keys & 0xFFFFFF, 24
+        colors = _count_colors(keys, bits, maxcolors)
+        if colors is None:
+            return None
+        values, counts = colors
+        if channels == 4 and bits == 24:
+            values = values | (np.uint32(alpha[0]) << np.uint32(24))
+        if channels == 2:
+            pixels = zip(values & 0xFF, values >> 8)
+        else:
+            pixels = zip((values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF, values >> 24)
+        return [(int(count), tuple(int(v) for v in pixel[:channels])) for count, pixel in zip(counts, pixels)]
 
     def getdata(self, band=None):
         channels, depth = self._get_channels_and_depth(self._mode)
@@ -986,7 +1508,18 @@ class Image(object):
         return flattened
 
     def getextrema(self):
-        return (np.minimum(self._instance), np.maximum(self._instance))
+        """
+        Gets the minimum and maximum pixel values for each band in
+        the image.
+
+        :returns: For a single-band image, a 2-tuple containing the
+           minimum and maximum pixel value.  For a multi-band image,
+           a tuple containing one 2-tuple for each band.
+        """
+        extrema = _band_extrema(self._instance)
+        if len(extrema) == 1:
+            return extrema[0]
+        return tuple(extrema)
 
     def getim(self):
         return self._instance
@@ -1015,22 +1548,81 @@ class Image(object):
         image must have the same size as the image, and be either a
         bi-level image (mode "1") or a greyscale image ("L").
 
+        For "I" and "F" images the values between the extrema are put
+        into 256 bins.
+
         :param mask: An optional mask.
+        :param extrema: An optional tuple of manually-specified extrema for
+           "I" and "F" images, the default are the extrema of the image.
         :returns: A list containing pixel counts.
         """
-        uni, counts = self._getcolors()
-        return [l for l in counts]
+        img = self._instance
+        if img.dtype == np.bool_:
+            img = img.view(np.uint8) * np.uint8(255)
+        if mask is not None:
+            mask = mask._instance if isinstance(mask, Image) else np.asarray(mask)
+            if mask.shape[:2] != img.shape[:2]:
+                raise ValueError("images do not match")
+            # masks made by new() have the shape (h, w, 1)
+            mask = mask.reshape(mask.shape[:2])
+            if mask.dtype != np.uint8:
+                mask = (mask != 0).view(np.uint8)
+        if img.dtype != np.uint8:
+            # I and F images, PIL maps the extrema to 256 bins
+            values = img if mask is None else img[mask != 0]
+            if extrema is None:
+                if not values.size:
+                    return [0] * 256
+                extrema = (values.min(), values.max())
+            low, high = extrema
+            if low >= high:
+                return [0] * 256
+            values = values[(values >= low) & (values <= high)]
+            scale = np.float32(255.0) / np.float32(high - low)
+            bins = ((values - low).astype(np.float32) * scale).astype(np.intp)
+            return np.bincount(bins, minlength=256)[:256].tolist()
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        # the histograms follow the band order of PIL, the image is BGR(A)
+        order = [2, 1, 0] + list(range(3, channels)) if channels >= 3 else list(range(channels))
+        hist = [cv2.calcHist([img], [c], mask, [256], [0, 256]) for c in order]
+        return np.concatenate(hist).ravel().astype(np.int64).tolist()
 
     def offset(self, xoffset, yoffset=None):
         raise NotImplementedError("offset() has been removed. "
                                   "Please call ImageChops.offset() instead.")
 
     def point(self, lut, mode=None):
-        "Map image through lookup table"
-        raise NotImplementedError("point() has been not implemented in this library. ")
+        """
+        Maps this image through a lookup table or function.
+
+        :param lut: A sequence of 256 values per band of the image, or a
+           function which is called for the values 0 to 255 and used for all
+           bands.  The tables are built once and reused by later calls with
+           the same function or values.  For I and F images the function is
+           applied to the pixel values.
+        :param mode: Output mode, only "1" is supported for 1 and L images.
+        :returns: An :py:class:`~PIL.Image.Image` object.
+        """
+        if mode is not None and mode != self.mode and not (mode == "1" and self.mode in ("1", "L")):
+            raise ValueError("mode mismatch", self.mode, mode)
+        _im = self._instance
+        if _im.dtype == np.bool_:
+            _im = _im.view(np.uint8) * np.uint8(255)
+        elif _im.dtype != np.uint8:
+            if not callable(lut):
+                raise ValueError("point operation not supported for this mode")
+            result = np.asarray(lut(_im.astype(np.float64)))
+            if _im.dtype.kind in "iu":
+                result = np.round(result)
+            return Image(np.broadcast_to(result, _im.shape).astype(_im.dtype))
+        table = _point_table(lut, 1 if _im.ndim == 2 else _im.shape[2])
+        _im = cv2.LUT(_im, table)
+        if mode == "1" or self.mode == "1":
+            _im = _im != 0
+        return Image(_im)
 
     def putpixel(self, xytup, color):
-        self._instance[xytup[1], xytup[0]] = color
+        self._make_writable()[xytup[1], xytup[0]] = color
 
     def putalpha(self, alpha):
         """
@@ -1114,11 +1706,15 @@ class Image(object):
     def remap_palette(self, dest_map, source_palette=None):
         raise NotImplementedError("remap_palette() has been not implemented in this library. ")
 
-    def resize(self, size, filtermethod = cv2.INTER_LINEAR, image=None):
-        "resizes an image according to the given filter/interpolation method NEAREST, BILINEAR/INTER_LINEAR, BICUBIC, LANCZOS, INTERAREA"
+    def resize(self, size, filtermethod = cv2.INTER_LINEAR, image=None, out=None):
+        """resizes an image according to the given filter/interpolation method NEAREST, BILINEAR/INTER_LINEAR, BICUBIC, LANCZOS, INTERAREA,
+        the result is written to out (an Image or a numpy array of the new size) if it is given"""
         if image is None:
-            _im = cv2.resize(self._instance, size, interpolation = filtermethod)
-            return Image(_im)
+            if self._instance.dtype == np.bool_:
+                # bilevel images are always resized with NEAREST like in PIL
+                return self._output(out, lambda dst: _bilevel(lambda src, dst: cv2.resize(src, tuple(size), dst=dst, interpolation=cv2.INTER_NEAREST),
+                                                              self._instance, dst))
+            return self._output(out, lambda dst: cv2.resize(self._instance, tuple(size), dst=dst, interpolation = filtermethod))
         else:
             return cv2.resize(image, size, interpolation = filtermethod)
 
@@ -1154,7 +1750,7 @@ class Image(object):
         return shifted
 
     def rotate(self, angle, resample=NEAREST, expand=0, center=None,
-               translate=None, fillcolor=None):
+               translate=None, fillcolor=None, out=None):
         """
         Returns a rotated copy of this image.  This method returns a
         copy of this image, rotated the given number of degrees counter
@@ -1177,28 +1773,40 @@ class Image(object):
            the upper left corner.  Default is the center of the image.
         :param translate: An optional post-rotate translation (a 2-tuple).
         :param fillcolor: An optional color for area outside the rotated image.
+        :param out: An optional Image or numpy array the rotated image is
+           written to, its buffer is reused if it has the size and mode
+           of the result.
         :returns: An :py:class:`~PIL.Image.Image` object.
         """
+        if self._instance.dtype == np.bool_:
+            # cv2 cannot rotate bool images, the 0 and 1 bytes are rotated instead
+            rotated = Image(self._instance.view(np.uint8)).rotate(angle, resample, expand, center, translate, fillcolor)
+            return self._output(out, lambda dst: _bilevel(lambda src, dst: src, rotated._instance))
         angle = angle % 360.0
         if fillcolor is None:
             fillcolor = (0, 0, 0)
-        if expand == 0:
-            # grab the dimensions of the image
-            h, w = self.size[1], self.size[0]
-
-            # if the center is None, initialize it as the center of
-            # the image
-            if center is None:
-                center = (w // 2, h // 2)
-            scale = 1.0
-            # perform the rotation
-            M = cv2.getRotationMatrix2D(center, angle, scale)
-            _im = cv2.warpAffine(self._instance, M, (w, h), borderValue=fillcolor)
-        else:
-            _im = self.rotate_bound(angle)
-        if translate is not None:
-            _im = self.translated(_im, translate[0], translate[0])
-        return Image(_im)
+        def op(dst):
+            if expand == 0:
+                # grab the dimensions of the image
+                h, w = self.size[1], self.size[0]
+
+                # if the center is None, initialize it as the center of
+                # the image
+                _center = center
+                if _center is None:
+                    _center = (w // 2, h // 2)
+                scale = 1.0
+                # perform the rotation
+                M = cv2.getRotationMatrix2D(_center, angle, scale)
+                if translate is None:
+                    return cv2.warpAffine(self._instance, M, (w, h), dst=dst, borderValue=fillcolor)
+                _im = cv2.warpAffine(self._instance, M, (w, h), borderValue=fillcolor)
+            else:
+                _im = self.rotate_bound(angle)
+            if translate is not None:
+                _im = self.translated(_im, translate[0], translate[0])
+            return _im
+        return self._output(out, op)
 
     def save(self, fp, format=None, **params):
         """
@@ -1214,8 +1822,19 @@ class Image(object):
 
         You can use a file object instead of a filename. In this case,
         you must always specify the format. The file object must
-        implement the ``seek``, ``tell``, and ``write``
-        methods, and be opened in binary mode.
+        implement the ``write`` method, and be opened in binary mode.
+        The image is encoded in memory with cv2.imencode, so a BytesIO
+        object gets the encoded image without a temporary file.
+
+        Supported options: ``quality``, ``optimize``, ``progressive`` and
+        ``subsampling`` for JPEG, ``compress_level`` and ``optimize`` for
+        PNG, ``quality`` and ``lossless`` for WEBP, ``compression`` and
+        ``dpi`` for TIFF.  GIF accepts ``save_all``, ``append_images``,
+        ``duration`` in milliseconds (a number or a list per frame) and
+        ``loop``.  The gif frames are encoded one at a time, so
+        ``append_images`` can be a generator of Image objects or numpy
+        images, e.g. the frames of a video, without keeping all of them
+        in memory.
 
         :param fp: A filename (string), pathlib.Path object or file object.
         :param format: Optional format override.  If omitted, the
@@ -1229,25 +1848,68 @@ class Image(object):
         :exception IOError: If the file could not be written.  The file
            may have been created, and may contain partial data.
         """
+        if hasattr(fp, "__fspath__"):
+            fp = fp.__fspath__()
         if isinstance(fp, basstring):
-            if fp.lower().endswith(".gif"):
-                if numpy2gif_installed:
-                    if self.is_animated:
-                        numpy2gif.write_gif(self.frames, fp, fps=100//self.exts[0][['delay_time']])
-                    else:
-                        numpy2gif.write_gif(self._instance, fp)
-                else:
-                    NotImplementedError("numpy2gif is not installed so cannot save gif images, install it with: pip install numpy2gif")
+            ext = os.path.splitext(fp)[1].lower()
+            if format is None:
+                if ext not in EXTENSION:
+                    raise ValueError("unknown file extension: {}".format(ext))
+                format = EXTENSION[ext]
+            format = format.upper()
+            if format == "GIF":
+                with builtins.open(fp, "wb") as fl:
+                    self._save_gif(fl, params)
+            elif EXTENSION.get(ext) == format:
+                if not cv2.imwrite(fp, _encodable(self._instance), _encoder_params(format, params)):
+                    raise IOError("cannot write image file", fp)
             else:
-                cv2.imwrite(fp, self._instance)
-            return None
-        if isinstance(fp, fil_object):
-            fl = open(format, 'w')
-            fl.write(fp.read())
-            fl.close()
+                with builtins.open(fp, "wb") as fl:
+                    self._encode(fl, format, params)
             return None
+        if format is None:
+            ext = os.path.splitext(getattr(fp, "name", ""))[1].lower()
+            if ext not in EXTENSION:
+                raise ValueError("format must be given when saving to a file object")
+            format = EXTENSION[ext]
+        if format.upper() == "GIF":
+            self._save_gif(fp, params)
+        else:
+            self._encode(fp, format.upper(), params)
         return None
 
+    def _save_gif(self, fp, params):
+        "writes the frames of the image and the append_images frames one by one as gif to the file object fp"
+        if params.get("save_all", self.is_animated):
+            frames = self.frames if self.is_animated else [self._instance]
+        else:
+            frames = [self._instance]
+        duration = params.get("duration")
+        if duration is None:
+            if self.exts and "delay_time" in self.exts[0]:
+                duration = self.exts[0]["delay_time"] * 10
+            else:
+                duration = 100
+        writer = _GifWriter(fp, duration=duration, loop=params.get("loop", 0))
+        for frame in frames:
+            writer.write(_gif_frame(frame))
+        if params.get("save_all", self.is_animated):
+            for frame in params.get("append_images", ()):
+                writer.write(_gif_frame(frame))
+        writer.close()
+
+    def _encode(self, fp, format, params):
+        "encodes the image with cv2.imencode and writes it to the file object fp"
+        if format not in _FORMAT_EXTENSION or format == "GIF":
+            raise ValueError("cannot encode format {} in memory".format(format))
+        ok, buf = cv2.imencode(_FORMAT_EXTENSION[format], _encodable(self._instance), _encoder_params(format, params))
+        if not ok:
+            raise IOError("cannot encode image as", format)
+        if py3:
+            fp.write(memoryview(buf))
+        else:
+            fp.write(buf.tostring())
+
     def seek(self, frame):
         """
         Seeks to the given frame in this sequence file. If you numpy2gifek
@@ -1264,14 +1926,15 @@ class Image(object):
         :exception EOFError: If the call attempts to seek beyond the end
             of the sequence.
         """
-        if frame>=self.n_frames:
-            raise EOFError("Frame number is beyond the number of frames")
-        else:
-            self._frame_nr = frame
+        try:
             self._instance = self.frames[frame]
+        except IndexError:
+            # the frame count of a video file is only an estimate or not known before the frames are read
+            raise EOFError("Frame number is beyond the number of frames")
+        self._frame_nr = frame
 
     def setim(self, numpy_image):
-        mode = Image()._get_mode(numpy_image.shape, numpy_image.dtype)
+        mode = _get_mode(numpy_image.shape, numpy_image.dtype)
         if mode != self._mode:
             raise ValueError("Modes of mother image and child image do not match", self._mode, mode)
         self._instance = numpy_image
@@ -1287,7 +1950,7 @@ class Image(object):
                 cv2.destroyWindow(title)
         else:
             flag, fname = tempfile.mkstemp()
-            cv2.imwrite(fname, self._instance)
+            cv2.imwrite(fname, _encodable(self._instance))
             os.system(command+" "+fname)
 
     def split(self, image=None):
@@ -1389,7 +2052,7 @@ class Image(object):
         self.pyaccess = None
 
     def transform(self, size, method, data=None, resample=NEAREST,
-                  fill=1, fillcolor=None):
+                  fill=1, fillcolor=None, out=None):
         """
         Transforms this image.  This method creates a new image with the
         given size, and the same mode as the original, and copies data
@@ -1429,65 +2092,66 @@ class Image(object):
           the arguments passed to it. Otherwise, it is unused.
         :param fillcolor: Optional fill color for the area outside the
            transform in the output image.
+        :param out: An optional Image or numpy array the transformed image
+           is written to, its buffer is reused if it has the size and mode
+           of the result.
         :returns: An :py:class:`~PIL.Image.Image` object.
         """
-        if method == EXTENT:
-            x0, y0, x1, y1 = data
-            part = self._instance[y0:y1, x0:x1]
-            _im = cv2.resize(part, size)
-        elif method == AFFINE:
-            x0, y0, x1, y1, x2, y2, x3, y3, x4, y4, x5, y5 = data
-            pts1 = np.float32([[x0, y0], [x1, y1], [x2, y2]])
-            pts2 = np.float32([[x3, y3], [x4, y4], [x5, y5]])
-            M = cv2.getAffineTransform(pts1,pts2)
-            _im = cv2.warpAffine(self._instance, M, size)
-        elif method == PERSPECTIVE or method == QUAD:
-            x0, y0, x1, y1, x2, y2, x3, y3 = data
-            pts1 = np.float32([[x0, y0], [x1, y1], [x2, y2], [x3, y3]])
-            pts2 = np.float32([[0,0],[size[0], 0], [0, size[1]], [size[0], size[1]]])
-            M = cv2.getPerspectiveTransform(pts1, pts2)
-            _im = cv2.warpPerspective(self._instance, M, size)
-        elif method == MESH:
-            _im = self._instance.copy()
-            for elem in data:
-                box, quad = elem
-                x0, y0, x1, y1, x2, y2, x3, y3 = quad
+        size = tuple(size)
+        def op(dst):
+            if method == EXTENT:
+                x0, y0, x1, y1 = data
+                part = self._instance[y0:y1, x0:x1]
+                _im = cv2.resize(part, size, dst=dst)
+            elif method == AFFINE:
+                x0, y0, x1, y1, x2, y2, x3, y3, x4, y4, x5, y5 = data
+                pts1 = np.float32([[x0, y0], [x1, y1], [x2, y2]])
+                pts2 = np.float32([[x3, y3], [x4, y4], [x5, y5]])
+                M = cv2.getAffineTransform(pts1,pts2)
+                _im = cv2.warpAffine(self._instance, M, size, dst=dst)
+            elif method == PERSPECTIVE or method == QUAD:
+                x0, y0, x1, y1, x2, y2, x3, y3 = data
                 pts1 = np.float32([[x0, y0], [x1, y1], [x2, y2], [x3, y3]])
-                pts2 = np.float32([[box[0], box[1]],[box[2], box[1]], [box[0], box[3]], [box[2], box[3]]])
+                pts2 = np.float32([[0,0],[size[0], 0], [0, size[1]], [size[0], size[1]]])
                 M = cv2.getPerspectiveTransform(pts1, pts2)
-                _im = cv2.warpPerspective(_im, M, size)
-        return Image(_im)
+                _im = cv2.warpPerspective(self._instance, M, size, dst=dst)
+            elif method == MESH:
+                _im = self._instance.copy()
+                for elem in data:
+                    box, quad = elem
+                    x0, y0, x1, y1, x2, y2, x3, y3 = quad
+                    pts1 = np.float32([[x0, y0], [x1, y1], [x2, y2], [x3, y3]])
+                    pts2 = np.float32([[box[0], box[1]],[box[2], box[1]], [box[0], box[3]], [box[2], box[3]]])
+                    M = cv2.getPerspectiveTransform(pts1, pts2)
+                    _im = cv2.warpPerspective(_im, M, size)
+            return _im
+        return self._output(out, op)
 
-    def transpose(self, method):
+    def transpose(self, method, out=None):
         """
         Transpose image (flip or rotate in 90 degree steps)
 
         :param method: One of :py:attr:`PIL.Image.FLIP_LEFT_RIGHT`,
           :py:attr:`PIL.Image.FLIP_TOP_BOTTOM`, :py:attr:`PIL.Image.ROTATE_90`,
           :py:attr:`PIL.Image.ROTATE_180`, :py:attr:`PIL.Image.ROTATE_270`,
+          :py:attr:`PIL.Image.TRANSPOSE` or :py:attr:`PIL.Image.TRANSVERSE`.
+        :param out: An optional Image or numpy array the result is written
+           to.  Flips and ROTATE_180 work in place, so out can be the image
+           itself.
         :returns: Returns a flipped or rotated copy of this image.
         """
-        w, h = self.size
-        if method == FLIP_LEFT_RIGHT:
-            _im = cv2.flip(self._instance, 1)
-        elif method == FLIP_TOP_BOTTOM:
-            _im = cv2.flip(self._instance, 0)
-        elif method == ROTATE_90:
-            _im = self.rotate_bound(270)
-            x = self.size[0]//2-self.size[1]//2
-            box = (0, x, self.size[0], x+self.size[1])
-            _im = self.crop(box, _im)
-        elif method == ROTATE_180:
-            _im = self.rotate(180, self._instance)
-        elif method == ROTATE_270:
-            _im = self.rotate_bound(90)
-            x = self.size[0]//2-self.size[1]//2
-            box = (0, x, self.size[0], x+self.size[1])
-            _im = self.crop(box, _im)
-        if isinstance(_im, Image):
-            return _im
-        elif isinstance(_im, np.ndarray):
-            return Image(_im)
+        if method in (FLIP_LEFT_RIGHT, FLIP_TOP_BOTTOM, ROTATE_180):
+            code = {FLIP_LEFT_RIGHT: 1, FLIP_TOP_BOTTOM: 0, ROTATE_180: -1}[method]
+            return self._output(out, lambda dst: cv2.flip(self._instance, code, dst=dst), inplace=True)
+        if method == ROTATE_90:
+            return self._output(out, lambda dst: cv2.rotate(self._instance, cv2.ROTATE_90_COUNTERCLOCKWISE, dst=dst))
+        if method == ROTATE_270:
+            return self._output(out, lambda dst: cv2.rotate(self._instance, cv2.ROTATE_90_CLOCKWISE, dst=dst))
+        if method == TRANSPOSE:
+            return self._output(out, lambda dst: cv2.transpose(self._instance, dst=dst))
+        if method == TRANSVERSE:
+            return self._output(out, lambda dst: cv2.flip(cv2.transpose(self._instance), -1, dst=dst))
+        raise ValueError("unknown transpose method", method)
 
     def verify(self):
         """
@@ -1500,6 +2164,227 @@ class Image(object):
         """
         pass
 
+def _encoder_params(format, params):
+    "maps the PIL keyword options of save() to a list of cv2 IMWRITE_* flags and values"
+    flags = []
+    if format == "JPEG":
+        if params.get("quality") is not None:
+            flags += [cv2.IMWRITE_JPEG_QUALITY, int(params["quality"])]
+        if params.get("optimize"):
+            flags += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if params.get("progressive") or params.get("progression"):
+            flags += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        subsampling = params.get("subsampling")
+        if subsampling in (0, 1, 2) and hasattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR"):
+            factors = (cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+                       cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420)
+            flags += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factors[subsampling]]
+    elif format == "PNG":
+        if params.get("compress_level") is not None:
+            flags += [cv2.IMWRITE_PNG_COMPRESSION, int(params["compress_level"])]
+        elif params.get("optimize"):
+            flags += [cv2.IMWRITE_PNG_COMPRESSION, 9]
+    elif format == "WEBP":
+        if params.get("lossless"):
+            # a quality above 100 selects the lossless encoder
+            flags += [cv2.IMWRITE_WEBP_QUALITY, 101]
+        elif params.get("quality") is not None:
+            flags += [cv2.IMWRITE_WEBP_QUALITY, max(1, int(params["quality"]))]
+    elif format == "TIFF":
+        if "compression" in params and params["compression"] in _TIFF_COMPRESSION:
+            flags += [cv2.IMWRITE_TIFF_COMPRESSION, _TIFF_COMPRESSION[params["compression"]]]
+        if params.get("dpi") is not None:
+            xdpi, ydpi = params["dpi"]
+            flags += [cv2.IMWRITE_TIFF_RESUNIT, 2, cv2.IMWRITE_TIFF_XDPI, int(xdpi), cv2.IMWRITE_TIFF_YDPI, int(ydpi)]
+    return flags
+
+def _lzw_encode(indices, min_code_size):
+    "compresses a sequence of color indices with the variable length LZW code of the gif format"
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    out = bytearray()
+    code_size = min_code_size + 1
+    codes, next_code = {}, end_code + 1
+    acc, nbits = clear_code, code_size
+    prefix = indices[0]
+    for index in indices[1:]:
+        key = (prefix << 8) | index
+        code = codes.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        acc |= prefix << nbits
+        nbits += code_size
+        while nbits >= 8:
+            out.append(acc & 255)
+            acc >>= 8
+            nbits -= 8
+        codes[key] = next_code
+        next_code += 1
+        if next_code > (1 << code_size):
+            code_size += 1
+        if next_code == 4096:
+            # the code table is full, start a new one
+            acc |= clear_code << nbits
+            nbits += code_size
+            codes, next_code, code_size = {}, end_code + 1, min_code_size + 1
+        prefix = index
+    for code in (prefix, end_code):
+        acc |= code << nbits
+        nbits += code_size
+        if code == prefix and next_code + 1 > (1 << code_size) and code_size < 12:
+            # the decoder adds the last code to its table before reading the end code
+            code_size += 1
+    while nbits > 0:
+        out.append(acc & 255)
+        acc >>= 8
+        nbits -= 8
+    return bytes(out)
+
+def _gif_keys(frame, bits=8):
+    "packs the upper bits of the BGR pixels of frame to RGB keys"
+    frame = (frame >> (8-bits)).astype(np.uint32)
+    return (frame[:, :, 2] << 2*bits) | (frame[:, :, 1] << bits) | frame[:, :, 0]
+
+def _gif_palette(keys):
+    "unpacks 24 bit RGB keys to a palette"
+    return np.stack([keys >> 16, (keys >> 8) & 255, keys & 255], axis=1)
+
+def _gif_quantize(frame, colors=256):
+    """
+    returns a palette of at most colors RGB entries for frame found by median
+    cut of its 15 bit colors and a table which maps each 15 bit color to the
+    nearest entry of the palette
+    """
+    keys, counts = np.unique(_gif_keys(frame, 5), return_counts=True)
+    rgb = np.stack([keys >> 10, (keys >> 5) & 31, keys & 31], axis=1)
+    def split_score(box):
+        span = rgb[box].max(axis=0) - rgb[box].min(axis=0)
+        return span.max() * counts[box].sum(), int(span.argmax())
+    boxes = [(split_score(np.arange(len(keys))), np.arange(len(keys)))]
+    while len(boxes) < colors:
+        best = max(range(len(boxes)), key=lambda i: boxes[i][0][0])
+        (score, channel), box = boxes[best]
+        if score == 0:
+            break
+        box = box[np.argsort(rgb[box, channel], kind="mergesort")]
+        weight = np.cumsum(counts[box])
+        cut = min(max(int(np.searchsorted(weight, weight[-1] / 2.0)) + 1, 1), len(box) - 1)
+        boxes[best:best+1] = [(split_score(part), part) for part in (box[:cut], box[cut:])]
+    palette = np.array([(rgb[box] * counts[box, None]).sum(axis=0) / float(counts[box].sum()) for score, box in boxes])
+    palette = np.round(palette * 255 / 31.0)
+    grid = np.arange(32768)
+    grid = np.stack([grid >> 10, (grid >> 5) & 31, grid & 31], axis=1) * 255 / 31.0
+    lut = np.empty(32768, dtype=np.uint8)
+    for start in range(0, 32768, 4096):
+        distance = ((grid[start:start+4096, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        lut[start:start+4096] = distance.argmin(axis=1)
+    return palette.astype(np.uint8), lut
+
+class _GifWriter(object):
+    """
+    Writes the frames of an animated gif to the file object fp as they are
+    passed to write(), so only one frame is held in memory.  The colors of
+    the first frame become the global color table, a median cut palette is
+    used if it has more than 256 colors.  Following frames use the global
+    table if it holds their colors or it is a shared median cut palette, and
+    get a local color table of their own colors otherwise.
+    """
+
+    def __init__(self, fp, duration=100, loop=0):
+        self.fp = fp
+        self.duration = duration
+        self.loop = loop
+        self.size = None
+        self.count = 0
+
+    @staticmethod
+    def _color_table(palette):
+        "returns the size bits of the color table and the table padded to a power of 2"
+        bits = max(int(len(palette) - 1).bit_length(), 1)
+        table = np.zeros((1 << bits, 3), dtype=np.uint8)
+        table[:len(palette)] = palette
+        return bits, table.tobytes()
+
+    def _start(self, frame):
+        "writes the header with the global color table of the first frame"
+        height, width = frame.shape[:2]
+        self.size = width, height
+        keys = np.unique(_gif_keys(frame))
+        if len(keys) <= 256:
+            self.keys, self.lut = keys, None
+            palette = _gif_palette(keys)
+        else:
+            self.keys = None
+            palette, self.lut = _gif_quantize(frame)
+        self.table_bits, table = self._color_table(palette)
+        self.fp.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xf0 | (self.table_bits-1), 0, 0) + table)
+        if self.loop is not None:
+            self.fp.write(b"\x21\xff\x0bNETSCAPE2.0" + struct.pack("<BBHB", 3, 1, self.loop, 0))
+
+    def _indices(self, frame):
+        "maps frame to color indices, returns them with the local color table or None for the global one"
+        unique, inverse = np.unique(_gif_keys(frame), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if self.keys is not None:
+            position = np.minimum(np.searchsorted(self.keys, unique), len(self.keys) - 1)
+            if np.array_equal(self.keys[position], unique):
+                return position[inverse].astype(np.uint8), None
+        if len(unique) <= 256:
+            return inverse.astype(np.uint8), _gif_palette(unique)
+        if self.lut is not None:
+            return self.lut[_gif_keys(frame, 5)].reshape(-1), None
+        palette, lut = _gif_quantize(frame)
+        return lut[_gif_keys(frame, 5)].reshape(-1), palette
+
+    def write(self, frame):
+        "appends a BGR uint8 frame to the animation"
+        if self.size is None:
+            self._start(frame)
+        frame = frame[:self.size[1], :self.size[0]]
+        height, width = frame.shape[:2]
+        indices, palette = self._indices(frame)
+        if isinstance(self.duration, (list, tuple)):
+            duration = self.duration[min(self.count, len(self.duration)-1)]
+        else:
+            duration = self.duration
+        # graphic control extension with disposal method 1: do not dispose
+        self.fp.write(struct.pack("<BBBBHBB", 0x21, 0xf9, 4, 0x04, int(round(duration / 10.0)), 0, 0))
+        if palette is None:
+            bits = self.table_bits
+            self.fp.write(struct.pack("<BHHHHB", 0x2c, 0, 0, width, height, 0))
+        else:
+            bits, table = self._color_table(palette)
+            self.fp.write(struct.pack("<BHHHHB", 0x2c, 0, 0, width, height, 0x80 | (bits-1)) + table)
+        min_code_size = max(bits, 2)
+        data = _lzw_encode(indices.tolist(), min_code_size)
+        out = bytearray(struct.pack("B", min_code_size))
+        for start in range(0, len(data), 255):
+            block = data[start:start+255]
+            out += struct.pack("B", len(block)) + block
+        out += b"\x00"
+        self.fp.write(out)
+        self.count += 1
+
+    def close(self):
+        self.fp.write(b"\x3b")
+
+def _gif_frame(frame):
+    "converts an Image or numpy image to a BGR uint8 frame for the gif writer"
+    if isinstance(frame, Image):
+        frame = frame._instance
+    if frame.dtype == np.bool_:
+        frame = frame.astype(np.uint8) * 255
+    elif frame.dtype != np.uint8:
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+    if frame.ndim == 3 and frame.shape[2] in (1, 2):
+        frame = np.ascontiguousarray(frame[:, :, 0])
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
 class FreeTypeFont(object):
     "FreeType font wrapper (requires python library freetype-py)"
     def __init__(self, font=None, size=10, index=0, encoding="",
@@ -1741,20 +2626,31 @@ def load_path(filename, size=12):
 
 class ImageDraw(object):
     def __init__(self, img, mode=None):
+        self.img = img
         try:
-            self.img = img
-            self._img_instance = self.img._instance
-            self.mode = Image()._get_mode(self._img_instance.shape, self._img_instance.dtype)
+            self.mode = _get_mode(self.img._instance.shape, self.img._instance.dtype)
             self.setink()
         except AttributeError:
-            self._img_instance = None
             self.mode = None
             self.ink = None
         self.fill = None
         self.palette = None
         self.font = None
 
-    def _convert_bgr2rgb(self, color):
+    @property
+    def _img_instance(self):
+        "the numpy image of the image which is drawn on, it is copied before drawing if its buffer is shared"
+        if not isinstance(self.img, Image):
+            return None
+        return self.img._make_writable()
+
+    @_img_instance.setter
+    def _img_instance(self, image):
+        if image is not None:
+            self.img._instance = image
+
+    @staticmethod
+    def _convert_bgr2rgb(color):
         if isinstance(color, tuple):
             if len(color) == 3:
                 color = color[::-1]
@@ -2081,11 +2977,11 @@ class ImageDraw(object):
 
     def setink(self):
         "Set ink to standard black by default"
-        if len(self._img_instance.shape) == 2:
+        if len(self.img._instance.shape) == 2:
             channels = 1
         else:
-            channels = self._img_instance.shape[2]
-        depth = self._img_instance.dtype
+            channels = self.img._instance.shape[2]
+        depth = self.img._instance.dtype
         if channels == 1 and depth == np.bool:
             self.ink = False
         if channels == 1 and depth == np.uint8:
@@ -2204,7 +3100,10 @@ def floodfill(image, xy, value, border=None, thresh=0, flags=130820):
         order for it to be replaced. Useful for filling regions of
         non-homogeneous, but similar, colors.
     """
-    _img_instance = image.getim()
+    if isinstance(image, Image):
+        _img_instance = image._make_writable()
+    else:
+        _img_instance = image.getim()
     if isinstance(value, tuple) or isinstance(value, list):
         value = value[::-1]
     h, w = _img_instance.shape[:2]
@@ -2366,26 +3265,30 @@ class ModeDescriptor(object):
     def __str__(self):
         return self.mode
 
+_modes = {}
+
 class ImageMode(object):
     def getmode(self, mode):
         """Gets a mode descriptor for the given mode."""
-        modes = {}
-        # core modes
-        for m, (basemode, basetype, bands) in _MODEINFO.items():
-            modes[m] = ModeDescriptor(m, bands, basemode, basetype)
-        # extra experimental modes
-        modes["RGBa"] = ModeDescriptor("RGBa",
-                                       ("R", "G", "B", "a"), "RGB", "L")
-        modes["LA"] = ModeDescriptor("LA", ("L", "A"), "L", "L")
-        modes["La"] = ModeDescriptor("La", ("L", "a"), "L", "L")
-        modes["PA"] = ModeDescriptor("PA", ("P", "A"), "RGB", "L")
-        # mapping modes
-        modes["I;16"] = ModeDescriptor("I;16", "I", "L", "L")
-        modes["I;16L"] = ModeDescriptor("I;16L", "I", "L", "L")
-        modes["I;16B"] = ModeDescriptor("I;16B", "I", "L", "L")
-        # set global mode cache atomically
-        _modes = modes
-        return _modes[mode]    
+        global _modes
+        if not _modes:
+            modes = {}
+            # core modes
+            for m, (basemode, basetype, bands) in _MODEINFO.items():
+                modes[m] = ModeDescriptor(m, bands, basemode, basetype)
+            # extra experimental modes
+            modes["RGBa"] = ModeDescriptor("RGBa",
+                                           ("R", "G", "B", "a"), "RGB", "L")
+            modes["LA"] = ModeDescriptor("LA", ("L", "A"), "L", "L")
+            modes["La"] = ModeDescriptor("La", ("L", "a"), "L", "L")
+            modes["PA"] = ModeDescriptor("PA", ("P", "A"), "RGB", "L")
+            # mapping modes
+            modes["I;16"] = ModeDescriptor("I;16", "I", "L", "L")
+            modes["I;16L"] = ModeDescriptor("I;16L", "I", "L", "L")
+            modes["I;16B"] = ModeDescriptor("I;16B", "I", "L", "L")
+            # set global mode cache atomically
+            _modes = modes
+        return _modes[mode]
 
 def _check_size(size):
     """
@@ -2422,18 +3325,15 @@ def new(mode, size, color=0):
 
     _check_size(size)
 
-    if color is None:
-        # don't initialize
-        _im = Image()._new(mode, size)
-        return Image(_im)
-
-    if type(color).__name__ == "str":
+    if color is not None and type(color).__name__ == "str":
         # css3-style specifier
-        color = ImageColor().getcolor(color, mode)
-        color = ImageDraw(None)._convert_bgr2rgb(color)
+        color = ImageColor().getcolor(color, _PREMULTIPLIED.get(mode, mode))
+        color = ImageDraw._convert_bgr2rgb(color)
 
-    _im = Image()._new(mode, size, color)
-    return Image(_im)
+    # color is None: don't initialize
+    im = Image(_new(mode, size, color))
+    im._color_mode = _NAMED_MODES.get(_mode_name(mode))
+    return im
 
 def frombytes(mode, size, data, decoder_name="raw", *args):
     """
@@ -2522,17 +3422,131 @@ def frombuffer(mode, size, data, decoder_name="raw", *args):
         if args == ():
             args = mode, 0, -1  # may change to (mode, 0, 1) post-1.1.6
         if args[0] in _MAPMODES:
-            channels, depth = Image()._get_channels_and_depth(mode)
-            im = np.frombuffer(data)
-            im = im.reshape((size[1], size[0], channels))
-            im = im.astype(depth)
-            im_ = new(mode, (1, 1))
-            im_._instance = im
+            stride = args[1] if len(args) > 1 else 0
+            orientation = args[2] if len(args) > 2 else 1
+            im_ = Image(_map_buffer(data, size, args[0], 0, stride, orientation))
             im_.readonly = 1
             return im_
 
     return frombytes(mode, size, data, decoder_name, args)
 
+def _map_buffer(data, size, rawmode, offset=0, stride=0, orientation=1):
+    """
+    Returns a read-only numpy view on raw pixel data in a buffer or mmap object.
+    Data in the other byte order is copied to native order, cv2 ignores the
+    byte order of a view.
+
+    :param rawmode: One of the keys of _MAPMODES.
+    :param offset: Offset of the first line in the buffer.
+    :param stride: Bytes between the start of two lines, 0 for packed lines.
+    :param orientation: 1 if the first line is the top line, -1 if it is the bottom line.
+    """
+    typ, bands = _MAPMODES[rawmode]
+    dtype = np.dtype(typ)
+    if stride <= 0:
+        stride = size[0] * bands * dtype.itemsize
+    if bands == 1:
+        shape = (size[1], size[0])
+        strides = (stride, dtype.itemsize)
+    else:
+        shape = (size[1], size[0], bands)
+        strides = (stride, bands * dtype.itemsize, dtype.itemsize)
+    try:
+        im = np.ndarray(shape, dtype=dtype, buffer=data, offset=offset, strides=strides)
+    except TypeError:
+        raise ValueError("not enough image data")
+    im.flags.writeable = False
+    if orientation < 0:
+        im = im[::-1]
+    if rawmode == "RGB":
+        im = im[:, :, ::-1]
+    elif rawmode == "RGBX":
+        im = im[:, :, 2::-1]
+    elif rawmode == "BGRX":
+        im = im[:, :, :3]
+    if not dtype.isnative:
+        im = im.astype(dtype.newbyteorder("="))
+    return im
+
+def _map_header(fp):
+    """
+    Identifies uncompressed PNM and BMP files whose pixel data can be memory mapped.
+
+    :returns: A (format, size, rawmode, offset, stride, orientation) tuple or None.
+    """
+    fp.seek(0)
+    prefix = fp.read(2)
+    if prefix in (b"P5", b"P6"):
+        fields = []
+        while len(fields) < 3:
+            c = fp.read(1)
+            if not c:
+                return None
+            if c == b"#":
+                while c not in (b"", b"\n", b"\r"):
+                    c = fp.read(1)
+            elif c.isspace():
+                continue
+            else:
+                field = c
+                c = fp.read(1)
+                while c and not c.isspace():
+                    field += c
+                    c = fp.read(1)
+                fields.append(int(field))
+        width, height, maxval = fields
+        if maxval >= 256:
+            # 16 bit samples are big endian, cv2 ignores the byte order of a numpy view
+            return None
+        if prefix == b"P5":
+            fmt = "PGM"
+            rawmode = "L"
+        else:
+            fmt = "PPM"
+            rawmode = "RGB"
+        return fmt, (width, height), rawmode, fp.tell(), 0, 1
+    if prefix == b"BM":
+        fp.seek(10)
+        offset, dibsize = struct.unpack("<II", fp.read(8))
+        if dibsize < 40:
+            return None
+        width, height, planes, bitcount, compression = struct.unpack("<iiHHI", fp.read(16))
+        stride = (width * bitcount + 31) // 32 * 4
+        orientation = -1 if height > 0 else 1
+        if bitcount == 24 and compression == 0:
+            rawmode = "BGR"
+        elif bitcount == 32 and compression == 0:
+            rawmode = "BGRX"
+        elif bitcount == 32 and compression == 3:
+            rawmode = "BGRA"
+        elif bitcount == 8 and compression == 0:
+            fp.seek(12, 1)
+            colorsused = struct.unpack("<I", fp.read(4))[0] or 256
+            fp.seek(14+dibsize)
+            table = np.frombuffer(fp.read(colorsused*4), dtype=np.uint8).reshape((-1, 4))[:, :3]
+            # only a greyscale ramp as color table can be viewed directly
+            if colorsused != 256 or np.any(table != np.arange(256, dtype=np.uint8)[:, None]):
+                return None
+            rawmode = "L"
+        else:
+            return None
+        return "BMP", (width, abs(height)), rawmode, offset, stride, orientation
+    return None
+
+def _open_mapped(filename):
+    "opens an uncompressed PNM or BMP file as a view on a read-only memory map of the file"
+    with builtins.open(filename, 'rb') as fp:
+        header = _map_header(fp)
+        if header is None:
+            return None
+        fmt, size, rawmode, offset, stride, orientation = header
+        if size[0] == 0 or size[1] == 0:
+            return None
+        mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    img = Image(_map_buffer(mapped, size, rawmode, offset, stride, orientation), filename, format=fmt)
+    img.readonly = 1
+    return img
+
 def fromarray(obj, mode=None):
     """
     Creates an image memory from an object exporting the array interface
@@ -2560,7 +3574,7 @@ def fromarray(obj, mode=None):
     .. versionadded:: 1.1.6
     """
     if isinstance(obj, np.ndarray):
-        _mode = Image()._get_mode(obj.shape, obj.dtype)
+        _mode = _get_mode(obj.shape, obj.dtype)
         if _mode == 'RGB':
             obj = cv2.cvtColor(obj, cv2.COLOR_RGB2BGR)
         elif mode == "RGBA":
@@ -2596,7 +3610,529 @@ _fromarray_typemap = {
 _fromarray_typemap[((1, 1), _ENDIAN + "i4")] = ("I", "I")
 _fromarray_typemap[((1, 1), _ENDIAN + "f4")] = ("F", "F")
 
-def open(fl, mode='r'):
+def _jpeg_header(fp):
+    "reads size and channels from the SOF segment of a JPEG file without decoding the scan data"
+    fp.seek(2)
+    while True:
+        b = fp.read(1)
+        while b and b != b"\xff":
+            b = fp.read(1)
+        while b == b"\xff":
+            b = fp.read(1)
+        if not b:
+            return None
+        marker = ord(b)
+        if marker == 0x01 or 0xd0 <= marker <= 0xd8:
+            # markers without a length field
+            continue
+        if marker in (0xd9, 0xda):
+            # end of image or start of scan before any frame header
+            return None
+        length = struct.unpack(">H", fp.read(2))[0]
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            precision, height, width, components = struct.unpack(">BHHB", fp.read(6))
+            if components == 1:
+                return "JPEG", (width, height), 1, np.uint8
+            # cv2 returns YCbCr, CMYK and YCCK data as BGR
+            return "JPEG", (width, height), 3, np.uint8
+        fp.seek(length-2, 1)
+
+def _png_header(fp):
+    "reads size, channels and depth from the IHDR chunk and looks for a tRNS chunk ahead of the image data"
+    fp.seek(8)
+    length, ctype = struct.unpack(">I4s", fp.read(8))
+    if ctype != b"IHDR":
+        return None
+    width, height, depth, colortype = struct.unpack(">IIBB", fp.read(10))
+    fp.seek(length-10+4, 1)
+    transparency = False
+    while True:
+        chunk = fp.read(8)
+        if len(chunk) < 8:
+            break
+        length, ctype = struct.unpack(">I4s", chunk)
+        if ctype in (b"IDAT", b"IEND"):
+            break
+        if ctype == b"tRNS":
+            transparency = True
+            break
+        fp.seek(length+4, 1)
+    if colortype in (4, 6):
+        channels = 4
+    elif colortype in (2, 3):
+        channels = 4 if transparency else 3
+    else:
+        channels = 1
+    dtype = np.uint16 if depth == 16 else np.uint8
+    return "PNG", (width, height), channels, dtype
+
+def _bmp_header(fp):
+    "reads size and channels from the info header and the color table of a BMP file"
+    fp.seek(10)
+    offset, dibsize = struct.unpack("<II", fp.read(8))
+    if dibsize == 12:
+        width, height, planes, bitcount = struct.unpack("<HHHH", fp.read(8))
+        compression = colorsused = 0
+        entrysize = 3
+    else:
+        width, height, planes, bitcount, compression = struct.unpack("<iiHHI", fp.read(16))
+        fp.seek(12, 1)
+        colorsused = struct.unpack("<I", fp.read(4))[0]
+        entrysize = 4
+    width, height = abs(width), abs(height)
+    if bitcount <= 8:
+        # cv2 returns a greyscale image if the color table contains only grey values
+        if not colorsused:
+            colorsused = 1 << bitcount
+        fp.seek(14+dibsize)
+        table = np.frombuffer(fp.read(colorsused*entrysize), dtype=np.uint8)
+        table = table[:len(table)//entrysize*entrysize].reshape((-1, entrysize))
+        if np.all(table[:, 0] == table[:, 1]) and np.all(table[:, 1] == table[:, 2]):
+            return "BMP", (width, height), 1, np.uint8
+        return "BMP", (width, height), 3, np.uint8
+    if bitcount == 32 and compression == 3:
+        # bitfields with an alpha mask
+        return "BMP", (width, height), 4, np.uint8
+    return "BMP", (width, height), 3, np.uint8
+
+def _tiff_header(fp):
+    "reads size, samples per pixel and depth from the first image file directory of a TIFF file"
+    fp.seek(0)
+    order = fp.read(2)
+    endian = "<" if order == b"II" else ">"
+    fp.seek(4)
+    fp.seek(struct.unpack(endian+"I", fp.read(4))[0])
+    entries = struct.unpack(endian+"H", fp.read(2))[0]
+    tags = {}
+    for i in range(entries):
+        tag, typ, count, value = struct.unpack(endian+"HHI4s", fp.read(12))
+        if typ == 3 and count > 2:
+            # more SHORT values than fit into the entry, read the first one from the offset
+            here = fp.tell()
+            fp.seek(struct.unpack(endian+"I", value)[0])
+            value = fp.read(2)
+            fp.seek(here)
+        if typ == 3:
+            value = struct.unpack(endian+"H", value[:2])[0]
+        else:
+            value = struct.unpack(endian+"I", value)[0]
+        tags[tag] = value
+    if 256 not in tags or 257 not in tags:
+        return None
+    width, height = tags[256], tags[257]
+    samples = tags.get(277, 1)
+    photometric = tags.get(262, 1)
+    bits = tags.get(258, 1)
+    if photometric == 3:
+        channels = 3
+    elif samples == 2:
+        channels = 4
+    else:
+        channels = samples
+    if bits == 16:
+        dtype = np.uint16
+    elif bits == 32 and tags.get(339) == 3:
+        dtype = np.float32
+    else:
+        dtype = np.uint8
+    return "TIFF", (width, height), channels, dtype
+
+def _webp_header(fp):
+    "reads size and alpha flag from the VP8, VP8L or VP8X chunk of a WebP file"
+    fp.seek(12)
+    fourcc, length = struct.unpack("<4sI", fp.read(8))
+    if fourcc == b"VP8 ":
+        frame = fp.read(10)
+        width, height = struct.unpack("<HH", frame[6:10])
+        return "WEBP", (width & 0x3fff, height & 0x3fff), 3, np.uint8
+    if fourcc == b"VP8L":
+        signature, bits = struct.unpack("<BI", fp.read(5))
+        width = (bits & 0x3fff) + 1
+        height = ((bits >> 14) & 0x3fff) + 1
+        channels = 4 if (bits >> 28) & 1 else 3
+        return "WEBP", (width, height), channels, np.uint8
+    if fourcc == b"VP8X":
+        data = fp.read(10)
+        channels = 4 if ord(data[0:1]) & 0x10 else 3
+        width = (struct.unpack("<I", data[4:7] + b"\x00")[0]) + 1
+        height = (struct.unpack("<I", data[7:10] + b"\x00")[0]) + 1
+        return "WEBP", (width, height), channels, np.uint8
+    return None
+
+_HEADER_PARSERS = (
+    (b"\xff\xd8", _jpeg_header),
+    (b"\x89PNG\r\n\x1a\n", _png_header),
+    (b"BM", _bmp_header),
+    (b"II*\x00", _tiff_header),
+    (b"MM\x00*", _tiff_header),
+    (b"RIFF", _webp_header),
+    )
+
+class _BufferFile(object):
+    "read-only file object over a buffer, lets _read_header parse in-memory images without copying them"
+
+    def __init__(self, data):
+        self._data = memoryview(data)
+        self._pos = 0
+
+    def read(self, n=-1):
+        if n < 0:
+            n = len(self._data) - self._pos
+        chunk = self._data[self._pos:self._pos+n].tobytes()
+        self._pos += len(chunk)
+        return chunk
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += len(self._data)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+# in-memory objects which open() wraps with np.frombuffer instead of copying them
+_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+def _read_header(fp):
+    """
+    Identifies an image file by its header without decoding the pixel data.
+
+    :param fp: A file object opened in binary mode and positioned anywhere.
+    :returns: A (format, size, channels, dtype) tuple describing the numpy image
+       cv2 will decode, or None if the file format is not recognized.
+    """
+    fp.seek(0)
+    prefix = fp.read(16)
+    for magic, parser in _HEADER_PARSERS:
+        if prefix.startswith(magic):
+            if magic == b"RIFF" and prefix[8:12] != b"WEBP":
+                return None
+            try:
+                return parser(fp)
+            except (struct.error, ValueError):
+                return None
+    return None
+
+class _GifFrames(object):
+    """
+    Sequence of the frames of a gif file which decodes a frame when it is
+    accessed.  The block structure of the file is scanned once to find the
+    frames, their graphic control extensions and the image specs.  A frame
+    is composed on top of the previous one, so it is decoded starting from
+    the nearest preceding frame in a small cache of recently used frames.
+    """
+    cache_size = 8
+
+    def __init__(self, filename):
+        with builtins.open(filename, 'rb') as fp:
+            self._data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._cache = collections.OrderedDict()
+        self._first = None
+        self._scan()
+
+    def _byte(self, pos):
+        return ord(self._data[pos:pos+1])
+
+    def _subblocks(self, pos):
+        "returns the data sub-blocks starting at pos including the empty terminator and the position after them"
+        blocks = []
+        while True:
+            n = self._byte(pos)
+            blocks.append(self._data[pos+1:pos+1+n])
+            pos += 1 + n
+            if n == 0:
+                return blocks, pos
+
+    def _skip_subblocks(self, pos):
+        while True:
+            n = self._byte(pos)
+            pos += 1 + n
+            if n == 0:
+                return pos
+
+    def _color_table(self, pos, flags):
+        size = 2 << (flags & 7)
+        table = np.frombuffer(self._data, dtype=np.uint8, count=size*3, offset=pos).reshape((size, 3))
+        return table, pos + size*3
+
+    def _scan(self):
+        "reads the headers and the offsets of all frames without decoding them"
+        data = self._data
+        if data[:3] != b"GIF":
+            raise IOError("not a gif file")
+        width, height, flags, background, aspect = struct.unpack("<HHBBB", data[6:13])
+        pos = 13
+        self._table = np.zeros((0, 3), dtype=np.uint8)
+        if flags & 0x80:
+            self._table, pos = self._color_table(pos, flags)
+        specs = {}
+        specs["Length"] = len(data)
+        specs["Header"] = "GIF " + data[3:6].decode("ascii")
+        specs["Color table size"] = 2 << (flags & 7)
+        specs["Color table existing"] = (flags & 0x80) != 0
+        specs["Image Size"] = width, height
+        specs["Flags"] = flags
+        specs["Background Color"] = background
+        specs["Pixel Aspect Ratio"] = aspect
+        specs["Color table length"] = len(self._table)
+        specs["Color table values"] = [tuple(int(c) for c in color) for color in self._table]
+        exts = []
+        self._frames = []
+        blocks = 0
+        while pos < len(data):
+            block = data[pos:pos+1]
+            pos += 1
+            blocks += 1
+            if block == b"\x21":
+                label = self._byte(pos)
+                pos += 1
+                if label == 0xf9:
+                    gflags, delay_time, transparent_idx = struct.unpack("<BHB", data[pos+1:pos+5])
+                    exts.append({"block_size": b"\x04", "flags": gflags, "delay_time": delay_time,
+                                 "transparent_idx": transparent_idx, "terminator": b"\x00"})
+                    pos = self._skip_subblocks(pos)
+                elif label == 0xff:
+                    subblocks, pos = self._subblocks(pos)
+                    specs["application_id"] = subblocks[0]
+                    for k in range(1, len(subblocks)):
+                        specs["application_subblocks"+str(k-1)] = subblocks[k]
+                elif label == 0xfe:
+                    subblocks, pos = self._subblocks(pos)
+                    specs["comment"] = b"".join(subblocks)
+                else:
+                    pos = self._skip_subblocks(pos)
+            elif block == b"\x2c":
+                left, top, fwidth, fheight, iflags = struct.unpack("<HHHHB", data[pos:pos+9])
+                pos += 9
+                if exts == [] or "lzw_min" in exts[-1]:
+                    # frame without its own graphic control extension
+                    exts.append({})
+                ext = exts[-1]
+                ext.update({"left": left, "top": top, "width": fwidth, "height": fheight,
+                            "flags1": iflags, "has_color_table": (iflags & 0x80) != 0})
+                local_table = None
+                if iflags & 0x80:
+                    local_table, pos = self._color_table(pos, iflags)
+                    ext["local_color_table"] = [tuple(int(c) for c in color) for color in local_table]
+                ext["lzw_min"] = self._byte(pos)
+                self._frames.append((ext, pos+1, local_table))
+                pos = self._skip_subblocks(pos+1)
+            else:
+                # trailer
+                break
+        specs["Data Blocks count"] = blocks
+        self.exts = exts
+        self.image_specs = specs
+
+    def _decode(self, index, previous):
+        "decodes frame index and composes it with the previous frame like gif2numpy"
+        ext, pos, local_table = self._frames[index]
+        subblocks, pos = self._subblocks(pos)
+        indices = gif2numpy.lzw_decompress(b"".join(subblocks), ext["lzw_min"])
+        width, height = ext["width"], ext["height"]
+        table = (self._table if local_table is None else local_table)[:, ::-1] # RGB -> BGR
+        pixels = np.zeros(width*height, dtype=np.intp)
+        n = min(len(indices), width*height)
+        pixels[:n] = indices[:n]
+        np.minimum(pixels, len(table)-1, out=pixels)
+        np_image = table[pixels].reshape((height, width, 3))
+        if index == 0:
+            return np_image
+        new_frame = gif2numpy.paste(self._first.copy(), np_image, ext["left"], ext["top"])
+        transparent_idx = ext.get("transparent_idx")
+        if transparent_idx is None or not ext["flags"] & 1 or transparent_idx >= len(table):
+            # no transparent color is set in the graphic control extension
+            return new_frame
+        transparent = np.all(new_frame == table[transparent_idx], axis=-1)
+        return np.where(transparent[:, :, None], previous, new_frame)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, index):
+        "returns a copy of the decoded frame index"
+        if index < 0:
+            index += len(self._frames)
+        if not 0 <= index < len(self._frames):
+            raise IndexError("frame index out of range")
+        if index in self._cache:
+            frame = self._cache.pop(index)
+        else:
+            start = max([i for i in self._cache if i < index] or [-1])
+            frame = self._cache[start] if start >= 0 else None
+            for i in range(start+1, index+1):
+                frame = self._decode(i, frame)
+                if i == 0:
+                    self._first = frame
+        self._cache[index] = frame
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return frame.copy()
+
+class _VideoFrames(object):
+    """
+    Sequence of the frames of a video file which are read with
+    cv2.VideoCapture when they are accessed.  Accessing the frames in order
+    streams the video, short jumps forward grab and drop the frames in
+    between and other jumps set CAP_PROP_POS_FRAMES.  Only the last frame
+    read is kept.  If the container does not report the frame count, the
+    count grows with the frames read.
+    """
+    grab_limit = 16
+
+    def __init__(self, filename):
+        self._capture = cv2.VideoCapture(filename)
+        if not self._capture.isOpened():
+            raise IOError("cannot open video file", filename)
+        self._count = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._next = 0
+        self._last = None
+        self._counted = self._count > 0
+        if not self._counted:
+            ok, frame = self._capture.read()
+            if not ok:
+                self.close()
+                raise IOError("cannot read video file", filename)
+            self._count = self._next = 1
+            self._last = 0, frame
+        fps = self._capture.get(cv2.CAP_PROP_FPS)
+        fourcc = int(self._capture.get(cv2.CAP_PROP_FOURCC))
+        # the delay between the frames in 1/100 s like in the gif extensions
+        self.exts = [{"delay_time": int(round(100.0 / fps)) if fps > 0 else 10}]
+        self.image_specs = {"Frame rate": fps, "Frame count": self._count,
+                            "Codec": "".join(chr((fourcc >> 8*i) & 255) for i in range(4)),
+                            "Image Size": (int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                           int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))}
+
+    def _read(self, index):
+        "decodes frame index, it is read directly if it follows the last frame read"
+        if index < self._next or index - self._next > self.grab_limit:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._next = index
+        while self._next < index:
+            if not self._capture.grab():
+                raise IndexError("frame index out of range")
+            self._next += 1
+        ok, frame = self._capture.read()
+        if not ok:
+            raise IndexError("frame index out of range")
+        self._next = index + 1
+        self._last = index, frame
+        if not self._counted:
+            self._count = max(self._count, self._next)
+        return frame
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        "returns a copy of the decoded frame index"
+        if index < 0:
+            index += self._count
+        if index < 0 or (self._counted and index >= self._count):
+            raise IndexError("frame index out of range")
+        if self._last is not None and self._last[0] == index:
+            return self._last[1].copy()
+        return self._read(index).copy()
+
+    def __iter__(self):
+        "streams all frames from the start of the video until no frame can be read"
+        index = 0
+        while True:
+            try:
+                frame = self._read(index)
+            except IndexError:
+                return
+            yield frame.copy()
+            index += 1
+
+    def close(self):
+        "releases the video file"
+        self._capture.release()
+
+    def __del__(self):
+        self.close()
+
+def _reduced_size(format, size, scale):
+    "returns the size of an image of size in format decoded by cv2 at 1/scale, JPEG sizes are rounded up and WebP sizes down"
+    if format == "WEBP":
+        return size[0]//scale, size[1]//scale
+    return (size[0]+scale-1)//scale, (size[1]+scale-1)//scale
+
+def _crop_resize(image, box, size, filtermethod=cv2.INTER_AREA):
+    """crops the numpy image to box and resizes the crop to size, the result is a new array.  The parts
+    of the box outside the image are black like in PIL's crop()"""
+    left, upper, right, lower = box
+    height, width = image.shape[:2]
+    x0, y0 = min(max(left, 0), width), min(max(upper, 0), height)
+    x1, y1 = max(min(right, width), x0), max(min(lower, height), y0)
+    if (x0, y0, x1, y1) != (left, upper, right, lower):
+        part = np.zeros((lower-upper, right-left) + image.shape[2:], dtype=image.dtype)
+        part[y0-upper:y1-upper, x0-left:x1-left] = image[y0:y1, x0:x1]
+        image = part
+    else:
+        image = image[upper:lower, left:right]
+    if size == (image.shape[1], image.shape[0]):
+        return image.copy()
+    return cv2.resize(image, size, interpolation=filtermethod)
+
+def _open_buffer(file_bytes):
+    "returns an Image which decodes the encoded image in the numpy buffer file_bytes on first access"
+    header = _read_header(_BufferFile(file_bytes))
+    if header is not None:
+        img = Image()
+        img._set_loader(file_bytes, header)
+    else:
+        _instance = cv2.imdecode(file_bytes, cv2.IMREAD_UNCHANGED)
+        if _instance is None:
+            raise IOError("cannot identify image file")
+        img = Image(_instance)
+    return img
+
+def open(fl, mode='r', mmap=False, size=None, box=None, filtermethod=cv2.INTER_AREA):
+    """
+    Opens and identifies the given image file.
+
+    This is a lazy operation; this function identifies the file by reading
+    its header, but the pixel data is not decoded until you try to process
+    the data (or call the :py:meth:`~PIL.Image.Image.load` method).  Size,
+    mode and format of JPEG, PNG, BMP, TIFF and WebP files are available
+    right after opening.
+
+    Gif images and video files (see ``VIDEO_EXTENSION``) are opened as
+    image sequences, use :py:meth:`~PIL.Image.Image.seek` to go to a frame
+    and ``n_frames`` for the number of frames.  The frames of a video are
+    read with cv2.VideoCapture when they are accessed, reading them in order
+    streams the video.
+
+    :param fl: A filename (string), a file object opened in binary mode
+       or an encoded image in memory as bytes, bytearray, memoryview,
+       BytesIO or mmap object.  In-memory images are not copied.
+    :param mode: The mode.  If given, this argument must be "r".
+    :param mmap: If true, uncompressed PGM, PPM and BMP files are memory
+       mapped instead of being read into memory.  The image is a read-only
+       view on the file, so only the regions you access are read from disk.
+       Other files are opened as usual.  For raw pixel dumps, map the file
+       with the mmap module and pass it to :py:func:`~PIL.Image.frombuffer`.
+    :param size: The size the image is resized to when it is decoded, this
+       is the same as ``open(fl).crop(box).resize(size)`` without the
+       intermediate images.  JPEG and WebP images are decoded at 1/2, 1/4
+       or 1/8 of the resolution if the box is still at least size then.
+    :param box: The region (left, upper, right, lower) of the image which
+       is kept, it defaults to the whole image.  For memory mapped images
+       only the rows of the box are read.  For gif images and videos this
+       applies to the first frame.
+    :param filtermethod: The cv2 interpolation which is used for resizing.
+    :returns: An :py:class:`~PIL.Image.Image` object.
+    :exception IOError: If the file cannot be found.
+    """
+    if size is not None or box is not None:
+        img = open(fl, mode, mmap)
+        img._set_region(size, box, filtermethod)
+        return img
     _mode = None
     _format = None
     if isinstance(fl, basstring):
@@ -2604,22 +4140,44 @@ def open(fl, mode='r'):
             raise IOError("cannot find image file", fl)
         if os.path.splitext(fl)[1].lower() == ".gif":
             if gif2numpy_installed:
-                _instances, _exts, _image_specs = gif2numpy.convert(fl)
+                # frames are decoded when they are accessed with seek()
+                _instances = _GifFrames(fl)
                 _instance = _instances[0]
-                img = Image(_instance, fl, instances = _instances, exts = _exts, image_specs = _image_specs)
+                img = Image(_instance, fl, instances = _instances, exts = _instances.exts, image_specs = _instances.image_specs)
             else:
                 raise NotImplementedError("gif2numpy has not been installed. Unable to read gif images, install it with: pip install gif2numpy")
+        elif os.path.splitext(fl)[1].lower() in VIDEO_EXTENSION:
+            # frames are read from the video when they are accessed with seek()
+            _instances = _VideoFrames(fl)
+            _instance = _instances[0]
+            img = Image(_instance, fl, VIDEO_EXTENSION[os.path.splitext(fl)[1].lower()], instances = _instances,
+                        exts = _instances.exts, image_specs = _instances.image_specs)
         else:
-            _instance = cv2.imread(fl, cv2.IMREAD_UNCHANGED)
-        # _mode = Image()._get_mode(_instance.shape, _instance.dtype)
-            img = Image(_instance, fl)
+            if mmap:
+                img = _open_mapped(fl)
+                if img is not None:
+                    return img
+            with builtins.open(fl, 'rb') as fp:
+                header = _read_header(fp)
+            img = Image(None, fl)
+            if header is not None:
+                img._set_loader(fl, header)
+            else:
+                img._instance = _instance = cv2.imread(fl, cv2.IMREAD_UNCHANGED)
+                if _instance is None:
+                    raise IOError("cannot identify image file", fl)
         return img
+    if isinstance(fl, _BUFFER_TYPES):
+        return _open_buffer(np.frombuffer(fl, dtype=np.uint8))
+    if hasattr(fl, "getbuffer"):
+        # BytesIO: getvalue() of a BytesIO made from bytes does not copy, and unlike
+        # getbuffer() it leaves the BytesIO free to be written, resized or closed
+        pos = fl.tell()
+        file_bytes = np.frombuffer(fl.getvalue(), dtype=np.uint8)[pos:]
+        fl.seek(0, 2)
+        return _open_buffer(file_bytes)
     if isinstance(fl, fil_object):
-        file_bytes = np.asarray(bytearray(fl.read()), dtype=np.uint8)
-        _instance = cv2.imdecode(file_bytes, cv2.IMREAD_UNCHANGED)
-        # _mode = Image()._get_mode(_instance.shape, _instance.dtype)
-        img = Image(_instance)
-        return img
+        return _open_buffer(np.frombuffer(fl.read(), dtype=np.uint8))
     if not py3:
         if isinstance(fl, cStringIO.InputType):
             fl.seek(0)
@@ -2634,99 +4192,192 @@ def open(fl, mode='r'):
         img = Image(_instance)
         return img
 
+def _open_loaded(fl):
+    "opens and decodes an image, runs in the worker threads of open_many"
+    img = open(fl)
+    img.load()
+    return img
+
+def open_many(fls, workers=4, ordered=True):
+    """
+    Opens and decodes a batch of images on a pool of worker threads.
+    cv2 releases the GIL while decoding, so the images are decoded in
+    parallel.  At most twice as many images as there are workers are
+    decoded ahead of the consumer, which keeps the memory bounded.
+
+    :param fls: An iterable of filenames, file objects or encoded images
+       in memory, anything :py:func:`~PIL.Image.open` accepts.
+    :param workers: Number of worker threads.  With 1 or without the
+       concurrent.futures module the images are decoded one after the other.
+    :param ordered: If true, the images are yielded in the order of fls,
+       otherwise as soon as they are decoded.
+    :returns: A generator of (index, image) tuples, index is the position
+       in fls.  If an image could not be opened, image is the exception
+       which was raised instead of an :py:class:`~PIL.Image.Image` object
+       and the batch continues.
+    """
+    if not futures_installed or workers <= 1:
+        for index, fl in enumerate(fls):
+            try:
+                img = _open_loaded(fl)
+            except Exception as e:
+                img = e
+            yield index, img
+        return
+    items = enumerate(fls)
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque() if ordered else {}
+        for index, fl in items:
+            future = executor.submit(_open_loaded, fl)
+            if ordered:
+                pending.append((index, future))
+            else:
+                pending[future] = index
+            if len(pending) < window:
+                continue
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished = wait(pending, return_when=FIRST_COMPLETED)[0]
+                done = [(pending.pop(future), future) for future in finished]
+            for index, future in done:
+                try:
+                    img = future.result()
+                except Exception as e:
+                    img = e
+                yield index, img
+        if ordered:
+            done = pending
+        else:
+            # a generator, so each image is yielded as soon as it is decoded
+            done = ((pending[future], future) for future in as_completed(pending))
+        for index, future in done:
+            try:
+                img = future.result()
+            except Exception as e:
+                img = e
+            yield index, img
+
 def blend(img1, img2, alpha):
     "blends 2 images using an alpha value>=0.0 and <=1.0"
     dst = cv2.addWeighted(img1, 1.0-alpha, img2, alpha, 0)
     return Image(dst)
 
-def composite(background, foreground, mask, np_image=False, neg_mask=False):
-    "pastes the foreground image into the background image using the mask"
-    # Convert uint8 to float
-    if isinstance(background, np.ndarray):
-        foreground = foreground.astype(float)
-        old_type = background.dtype
-        background = background.astype(float)
-        # Normalize the alpha mask to keep intensity between 0 and 1
-        if neg_mask:
-            alphamask = mask.astype(float)/255
-        else:
-            alphamask = (~mask).astype(float)/255
-    else:
-        foreground = foreground._instance.astype(float)
-        old_type = background.dtype
-        background = background._instance.astype(float)
-        # Normalize the alpha mask to keep intensity between 0 and 1
-        if neg_mask:
-            alphamask = mask._instance.astype(float)/255
-        else:
-            alphamask = (~(mask._instance)).astype(float)/255
-    fslen = len(foreground.shape)
-    if len(alphamask.shape) != fslen:
-        img = np.zeros(foreground.shape, dtype=foreground.dtype)
-        if fslen>2:
-            if foreground.shape[2] >= 2:
-                img[:,:,0] = alphamask
-                img[:,:,1] = alphamask
-            if foreground.shape[2] >= 3:
-                img[:,:,2] = alphamask
-            if foreground.shape[2] == 4:
-                img[:,:,3] = alphamask
-            alphamask = img.copy()
-    # Multiply the foreground with the alpha mask
-    try:
-        foreground = cv2.multiply(alphamask, foreground)
-    except:
-        if alphamask.shape[2] == 1 and foreground.shape[2] == 3:
-            triplemask = cv2.merge((alphamask, alphamask, alphamask))
-            foreground = cv2.multiply(triplemask, foreground)
-        else:
-            raise ValueError("OpenCV Error: Sizes of input arguments do not match (The operation is neither 'array op array' (where arrays have the same size and the same number of channels), nor 'array op scalar', nor 'scalar op array') in cv::arithm_op, file ..\..\..\..\opencv\modules\core\src\arithm.cpp")
-    # Multiply the background with ( 1 - alpha )
-    bslen = len(background.shape)
-    if len(alphamask.shape) != bslen:
-        img = np.zeros(background.shape, dtype=background.dtype)
-        if bslen>2:
-            if background.shape[2] >= 2:
-                img[:,:,0] = alphamask
-                img[:,:,1] = alphamask
-            if background.shape[2] >= 3:
-                img[:,:,2] = alphamask
-            if background.shape[2] == 4:
-                img[:,:,3] = alphamask
-            alphamask = img.copy()
-    try:
-        background = cv2.multiply(1.0 - alphamask, background)
-    except:
-        if alphamask.shape[2] == 1 and foreground.shape[2] == 3:
-            background = cv2.multiply(1.0 - triplemask, background)
+def _paste_region(shape, child_shape, x, y):
+    """returns the (destination, source) slices of an image of child_shape pasted at (x, y) into an
+    image of shape, clipped to both images, or None if they do not intersect"""
+    x, y = int(x), int(y)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + child_shape[1], shape[1]), min(y + child_shape[0], shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return ((slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+def _mask_band(mask):
+    """returns the single band of a mask as numpy array, the alpha band of LA and RGBA masks and the
+    grey level of RGB masks, bilevel masks are 0 or 255"""
+    mask = mask._instance if isinstance(mask, Image) else np.asarray(mask)
+    if mask.dtype == np.bool_:
+        mask = mask.view(np.uint8) * np.uint8(255)
+    if mask.ndim == 3:
+        if mask.shape[2] == 3:
+            mask = cv2.cvtColor(mask, cv2.COLOR_BGR2GRAY)
         else:
-            raise ValueError("OpenCV Error: Sizes of input arguments do not match (The operation is neither 'array op array' (where arrays have the same size and the same number of channels), nor 'array op scalar', nor 'scalar op array') in cv::arithm_op, file ..\..\..\..\opencv\modules\core\src\arithm.cpp")
-    # Add the masked foreground and background
-    outImage = cv2.add(foreground, background)
-    outImage = outImage/255
-    outImage = outImage*255
-    outImage = outImage.astype(old_type)
+            mask = mask[..., -1]
+    return mask
+
+def _blend_masked(image1, image2, mask, dst=None):
+    """returns image1 where mask is 255 and image2 where it is 0, mask is a single band of the size of
+    the numpy images and broadcast to all channels.  8 bit and float images are blended in a single
+    cv2.blendLinear with float32 weights, the result is written to dst if it fits"""
+    if image1.shape != image2.shape or image1.dtype != image2.dtype or mask.shape[:2] != image1.shape[:2]:
+        raise ValueError("images do not match")
+    weights1 = _scratch_buffer("weights1", mask.shape, "F")
+    np.copyto(weights1, mask, casting="unsafe")
+    weights2 = np.subtract(np.float32(255), weights1, out=_scratch_buffer("weights2", mask.shape, "F"))
+    if image1.dtype in (np.uint8, np.float32):
+        # blendLinear divides by the sum of the weights which is 255
+        return cv2.blendLinear(image1, image2, weights1, weights2, dst=dst)
+    weights1 *= np.float32(1.0 / 255)
+    if image1.ndim == 3:
+        weights1 = weights1[..., None]
+    result = image2 + (image1.astype(np.float32) - image2) * weights1
+    if image1.dtype.kind in "iu":
+        result = np.round(result)
+    if dst is not None and dst.shape == result.shape and dst.dtype == image1.dtype:
+        np.copyto(dst, result, casting="unsafe")
+        return dst
+    return result.astype(image1.dtype)
+
+def composite(background, foreground, mask, np_image=False, neg_mask=False, out=None):
+    """pastes the foreground image into the background image using the mask.  Like PIL.Image.composite
+    the first image shows where the mask is 255 and the second where it is 0, neg_mask swaps them.  The
+    mask is a 1, L or RGBA image or numpy array, a single band which is applied to all channels.  The
+    result is written to out (an Image or a numpy array) if it is given, out can be one of the images."""
+    # the result has the mode of the background, the blend of premultiplied images is premultiplied
+    like = background if isinstance(background, Image) else Image(background)
+    background = like._instance
+    if isinstance(foreground, Image):
+        foreground = foreground._instance
+    mask = _mask_band(mask)
+    if neg_mask:
+        background, foreground = foreground, background
+    def blend(dst):
+        result = _blend_masked(background, foreground, mask, dst)
+        # cv2 returns single band images of shape (h, w, 1) as (h, w)
+        return result if result is dst else result.reshape(background.shape)
+    result = like._output(out, blend, inplace=True)
     if np_image:
-        return outImage
-    else:
-        return Image(outImage)
-
-def alpha_composite(im1, im2):
+        return result._instance
+    return result
+
+def _alpha_over(dst, src, premultiplied=False):
+    """composites the numpy BGRA image src over dst of the same size in place with the Porter-Duff over
+    operator.  With straight alpha the colors are blended in a single cv2.blendLinear with the weights
+    src alpha * 255 and dst alpha * (255 - src alpha) which add up to 255 times the resulting alpha"""
+    if dst.shape != src.shape or dst.dtype != src.dtype:
+        raise ValueError("images do not match")
+    src_alpha = src[..., 3]
+    if premultiplied:
+        # dst = src + dst * (1 - src alpha)
+        weights = cv2.subtract(255, src_alpha)
+        dst[...] = cv2.add(src, cv2.multiply(dst, cv2.merge((weights,) * 4), scale=1.0 / 255))
+        return dst
+    weights1 = _scratch_buffer("weights1", src_alpha.shape, "F")
+    np.multiply(src_alpha, np.float32(255), out=weights1)
+    weights2 = _scratch_buffer("weights2", src_alpha.shape, "F")
+    np.subtract(np.float32(255), src_alpha, out=weights2)
+    weights2 *= dst[..., 3]
+    alpha = weights1 + weights2
+    result = cv2.blendLinear(src, dst, weights1, weights2, dst=dst)
+    if result is not dst:
+        dst[...] = result
+    np.multiply(alpha, np.float32(1.0 / 255), out=alpha)
+    np.rint(alpha, out=alpha)
+    dst[..., 3] = alpha
+    return dst
+
+def alpha_composite(im1, im2, premultiplied=False):
     """
     Alpha composite im2 over im1.
 
-    :param im1: The first image. Must have mode RGBA.
-    :param im2: The second image.  Must have mode RGBA, and the same size as
-       the first image.
+    :param im1: The first image. Must have mode RGBA or RGBa.
+    :param im2: The second image.  Must have mode RGBA or RGBa, and the same
+       size as the first image.
+    :param premultiplied: Optional flag, the colors of both images are
+       premultiplied with their alpha, it is set if im1 has mode RGBa
     :returns: An :py:class:`~PIL.Image.Image` object.
     """
-    r1, g1, b1, a1 = Image().split(im1)
-    r2, g2, b2, a2 = Image().split(im2)
-    alphacomp = np.zeros(im1.shape, dtype=im1.dtype)
-    im3 = composite(alphacomp, im1, a1)
-    alphacomp = np.zeros(im2.shape, dtype=im2.dtype)
-    im4 = composite(alphacomp, im2, a2)
-    return blend(im3, im4, 0.5)
+    if not isinstance(im1, Image):
+        im1 = Image(im1)
+    if not isinstance(im2, Image):
+        im2 = Image(im2)
+    if im1.size != im2.size:
+        raise ValueError("images do not match")
+    result = im1.copy()
+    result.alpha_composite(im2, premultiplied=premultiplied)
+    return result
 
 def merge(mode, colorbandtuple, image=False):
     "merges three channels to one band"
@@ -2739,7 +4390,7 @@ def merge(mode, colorbandtuple, image=False):
         alpha = None
     elif len(colorbandtuple) == 4:
         red, green, blue, alpha = colorbandtuple
-    channels, depth = Image()._get_channels_and_depth(mode)
+    channels, depth = _get_channels_and_depth(mode)
     img_dim = red.shape
     img = np.zeros((img_dim[0], img_dim[1], channels), dtype=depth)
     img[:,:,0] = red
@@ -2755,7 +4406,7 @@ def merge(mode, colorbandtuple, image=False):
 
 def linear_gradient(mode, size=256):
     "Generate 256x256 linear gradient from black to white, top to bottom."
-    channels, depth = Image()._get_channels_and_depth(mode)
+    channels, depth = _get_channels_and_depth(mode)
     if channels == 1:
         y = np.linspace(0, size-1, size)
         gradient = np.tile(y, (size, 1)).T
@@ -2769,7 +4420,7 @@ def linear_gradient(mode, size=256):
 
 def radial_gradient(mode, size=256, innerColor=(0, 0, 0), outerColor=(255, 255, 255)):
     "Generate 256x256 radial gradient from black to white, centre to edge."
-    channels, depth = Image()._get_channels_and_depth(mode)
+    channels, depth = _get_channels_and_depth(mode)
     gradient = np.zeros((size, size, channels), dtype=depth)
     if channels == 1:
         _max_value = 1
@@ -2807,18 +4458,23 @@ def radial_gradient(mode, size=256, innerColor=(0, 0, 0), outerColor=(255, 255,
 
 def constant(image, value):
     "Fill a channel with a given grey level"
-    return Image.new("L", image.size, value)
+    return new("L", image.size, value)
 
 def duplicate(image):
     "Create a copy of a channel"
     return image.copy()
 
-def invert(image, im=None):
+def invert(image, im=None, out=None):
     "Invert a channel"
-    if im is None:
-        return ~image.getim()
-    else:
+    # (MAX - image), the numpy image im is inverted instead if it is given
+    if im is not None:
         return ~im
+    src = image._instance
+    def op(dst):
+        if src.dtype == np.bool_:
+            return np.logical_not(src, out=dst)
+        return cv2.bitwise_not(src, dst=dst)
+    return image._output(out, op, inplace=True)
 
 def _reduce_images(image1, image2):
     "bring two images to an identical size using the minimum side of each image"
@@ -2828,124 +4484,322 @@ def _reduce_images(image1, image2):
     image2_copy = image2._instance[:s0,:s1]
     return image1_copy, image2_copy
 
-def lighter(image1, image2):
+# The channel operations combine the images with the saturating cv2 arithmetic in the dtype of
+# the images and return an Image, which is written to out (an Image or a numpy array of the
+# result size, it can be one of the images) if it is given.
+
+def _chops(image1, image2, op, out=None):
+    """returns the Image of op(a, b, dst) for the numpy images a and b of image1 and image2, cropped to
+    the smaller size of both, image2 is converted to the mode of image1 if the layouts differ"""
+    a, b = _reduce_images(image1, image2)
+    if b.dtype != a.dtype or (b.shape[2:] or (1,)) != (a.shape[2:] or (1,)):
+        b = image1._convert(image1.mode, obj=b)
+    if a.dtype == np.bool_:
+        # bilevel images are combined as 0 and 255 like in PIL
+        a, b = a.view(np.uint8) * np.uint8(255), b.view(np.uint8) * np.uint8(255)
+        return image1._like(a)._output(out, lambda dst: op(a, b, None) > 127, inplace=True)
+    return image1._like(a)._output(out, lambda dst: op(a, b, dst), inplace=True)
+
+def lighter(image1, image2, out=None):
     "Select the lighter pixels from each image"
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.maximum(image1_copy, image2_copy)
+    # max(image1, image2)
+    return _chops(image1, image2, lambda a, b, dst: cv2.max(a, b, dst=dst), out)
 
-def darker(image1, image2):
+def darker(image1, image2, out=None):
     "Select the darker pixels from each image"
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.minimum(image1_copy, image2_copy)
+    # min(image1, image2)
+    return _chops(image1, image2, lambda a, b, dst: cv2.min(a, b, dst=dst), out)
 
-def difference(image1, image2):
+def difference(image1, image2, out=None):
     "Subtract one image from another"
-    # does not work as in PIL, needs to be fixed
     # Calculate absolute difference
     # (abs(image1 - image2)).
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.absolute(np.subtract(image1_copy, image2_copy))
+    return _chops(image1, image2, lambda a, b, dst: cv2.absdiff(a, b, dst=dst), out)
 
-def multiply(image1, image2):
+def multiply(image1, image2, out=None):
     "Superimpose two positive images"
-    # broken, needs to be fixed
     # Superimpose positive images
     # (image1 * image2 / MAX).
     # <p>
     # Superimposes two images on top of each other. If you multiply an
     # image with a solid black image, the result is black. If you multiply
     # with a solid white image, the image is unaffected.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    div = np.divide(image2_copy, 255)
-    return np.multiply(image1_copy, div)
+    def op(a, b, dst):
+        return cv2.multiply(a, b, dst=dst, scale=1.0 / 255 if a.dtype == np.uint8 else 1.0)
+    return _chops(image1, image2, op, out)
 
-def screen(image1, image2):
+def screen(image1, image2, out=None):
     "Superimpose two negative images"
     # Superimpose negative images
     # (MAX - ((MAX - image1) * (MAX - image2) / MAX)).
     # <p>
     # Superimposes two inverted images on top of each other.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    max_image = np.maximum(image1_copy, image2_copy)
-    return (max_image - ((max_image - image1_copy) * (max_image - image2_copy) / max_image))
+    def op(a, b, dst):
+        dst = cv2.multiply(cv2.bitwise_not(a), cv2.bitwise_not(b), dst=dst, scale=1.0 / 255)
+        return cv2.bitwise_not(dst, dst=dst)
+    return _chops(image1, image2, op, out)
 
-def add(image1, image2, scale=1.0, offset=0):
+def add(image1, image2, scale=1.0, offset=0, out=None):
     "Add two images"
     # ((image1 + image2) / scale + offset).
     # Adds two images, dividing the result by scale and adding the
     # offset. If omitted, scale defaults to 1.0, and offset to 0.0.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.add(image1_copy, image2_copy)/scale+offset
+    def op(a, b, dst):
+        if scale == 1.0 and offset == 0:
+            return cv2.add(a, b, dst=dst)
+        return cv2.addWeighted(a, 1.0 / scale, b, 1.0 / scale, offset, dst=dst)
+    return _chops(image1, image2, op, out)
 
-def subtract(image1, image2, scale=1.0, offset=0):
+def subtract(image1, image2, scale=1.0, offset=0, out=None):
     "Subtract two images"
     # Subtract images
     # ((image1 - image2) / scale + offset).
     # Subtracts two images, dividing the result by scale and adding the
     # offset. If omitted, scale defaults to 1.0, and offset to 0.0.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.subtract(image1_copy, image2_copy)/scale+offset
+    def op(a, b, dst):
+        if scale == 1.0 and offset == 0:
+            return cv2.subtract(a, b, dst=dst)
+        return cv2.addWeighted(a, 1.0 / scale, b, -1.0 / scale, offset, dst=dst)
+    return _chops(image1, image2, op, out)
 
-def add_modulo(image1, image2):
+def add_modulo(image1, image2, out=None):
     "Add two images without clipping"
     # Add images without clipping
     # ((image1 + image2) % MAX).
     # Adds two images, without clipping the result.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.mod(np.add(image1_copy, image2_copy), np.maximum(image1_copy, image2_copy))
+    return _chops(image1, image2, lambda a, b, dst: np.add(a, b, out=dst), out)
 
-def subtract_modulo(image1, image2):
+def subtract_modulo(image1, image2, out=None):
     "Subtract two images without clipping"
     # Subtract images without clipping
     # ((image1 - image2) % MAX).
     # Subtracts two images, without clipping the result.
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.mod(np.subtract(image1_copy, image2_copy), np.maximum(image1_copy, image2_copy))
+    return _chops(image1, image2, lambda a, b, dst: np.subtract(a, b, out=dst), out)
 
-def logical_and(image1, image2):
+def logical_and(image1, image2, out=None):
     "Logical and between two images"
     # Logical AND
     # (image1 and image2).
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.logical_and(image1_copy, image2_copy)
-
+    return _chops(image1, image2, lambda a, b, dst: cv2.bitwise_and(a, b, dst=dst), out)
 
-def logical_or(image1, image2):
+def logical_or(image1, image2, out=None):
     "Logical or between two images"
     # Logical OR
     # (image1 or image2).
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.logical_or(image1_copy, image2_copy)
+    return _chops(image1, image2, lambda a, b, dst: cv2.bitwise_or(a, b, dst=dst), out)
 
-def logical_xor(image1, image2):
+def logical_xor(image1, image2, out=None):
     "Logical xor between two images"
     # Logical XOR
     # (image1 xor image2).
-    image1_copy, image2_copy = _reduce_images(image1, image2)
-    return np.logical_xor(image1_copy, image2_copy)
+    return _chops(image1, image2, lambda a, b, dst: cv2.bitwise_xor(a, b, dst=dst), out)
+
+class _Enhance(object):
+
+    def enhance(self, factor):
+        """
+        Returns an enhanced image.
+
+        :param factor: A floating point value controlling the enhancement.
+                       Factor 1.0 always returns a copy of the original image,
+                       lower factors mean less color (brightness, contrast,
+                       etc), and higher values more. There are no restrictions
+                       on this value.
+        :rtype: :py:class:`~PIL.Image.Image`
+        """
+        # blends the image with the degenerate image prepared by the constructor
+        return self.image._like(cv2.addWeighted(self.image._instance, factor, self.degenerate._instance, 1.0 - factor, 0))
+
+class _ConstantEnhance(_Enhance):
+    "enhancers whose degenerate image has the single value offset, the blend is one lookup table for 8 bit images"
+    offset = 0.0
 
-class Brightness(object):
+    def enhance(self, factor):
+        img = self.image._instance
+        offset = self.offset * (1.0 - factor)
+        if img.dtype != np.uint8:
+            return self.image._like(cv2.addWeighted(img, factor, img, 0, offset))
+        bands = 1 if img.ndim == 2 else img.shape[2]
+        table = np.empty((256, 1, bands), np.uint8)
+        table[:, 0, :] = np.clip(np.round(np.arange(256) * factor + offset), 0, 255)[:, None]
+        if self.image.mode in ("LA", "RGBA", "La", "RGBa"):
+            # the alpha band is kept as it is
+            table[:, 0, -1] = np.arange(256)
+        return self.image._like(cv2.LUT(img, table))
+
+class Color(_Enhance):
+    """Adjust image color balance.
+
+    This class can be used to adjust the colour balance of an image, in
+    a manner similar to the controls on a colour TV set. An enhancement
+    factor of 0.0 gives a black and white image. A factor of 1.0 gives
+    the original image.
+    """
 
     def __init__(self, image):
         self.image = image
+        self.intermediate_mode = "L"
+        if "A" in image.getbands():
+            self.intermediate_mode = "LA"
+        self.degenerate = image.convert(self.intermediate_mode).convert(image.mode)
 
-    def enhance(self, factor):
-        # Brightness control (0-100) which is 0.0 to 1.0 in original PIL
-        img = self.image.getim()
-        brightness = (1-factor)*-255
-        adjusted = cv2.addWeighted(img, 1.0, np.zeros(img.shape, img.dtype), 0, brightness)
-        return Image(adjusted)
+class Contrast(_ConstantEnhance):
+    """Adjust image contrast.
+
+    This class can be used to control the contrast of an image, similar
+    to the contrast control on a TV set. An enhancement factor of 0.0
+    gives a solid grey image. A factor of 1.0 gives the original image.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        # the degenerate image is a grey image of the mean luminance
+        self.offset = float(int(cv2.mean(image.convert("L")._instance)[0] + 0.5))
 
-class Contrast(object):
+class Brightness(_ConstantEnhance):
+    """Adjust image brightness.
+
+    This class can be used to control the brightness of an image.  An
+    enhancement factor of 0.0 gives a black image. A factor of 1.0 gives the
+    original image.
+    """
 
     def __init__(self, image):
         self.image = image
 
-    def enhance(self, factor):
-        img = self.image.getim()
-        # Contrast control factor which is 0.0 to 1.0 in original PIL
-        adjusted = cv2.convertScaleAbs(img, alpha=factor, beta=0)
-        return Image(adjusted)
+class Sharpness(_Enhance):
+    """Adjust image sharpness.
+
+    This class can be used to adjust the sharpness of an image. An
+    enhancement factor of 0.0 gives a blurred image, a factor of 1.0 gives the
+    original image, and a factor of 2.0 gives a sharpened image.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self.degenerate = image.filter(SMOOTH)
+        img, degenerate = image._instance, self.degenerate._instance
+        # like PIL the border pixels are not smoothed
+        degenerate[[0, -1]] = img[[0, -1]]
+        degenerate[:, [0, -1]] = img[:, [0, -1]]
+        if "A" in image.getbands():
+            degenerate[..., -1] = img[..., -1]
+
+class Stat(object):
+    """Calculates statistics for each band of an image, like PIL.ImageStat.Stat.
+
+    The statistics are computed when they are first used: the extrema
+    with cv2.minMaxLoc, count, sum, sum2, mean, var, rms and stddev from
+    one cv2.meanStdDev and the median from the histogram.  A histogram
+    list can be given instead of an image.
+    """
+
+    def __init__(self, image_or_list, mask=None):
+        if isinstance(image_or_list, Image):
+            self.image = image_or_list
+            self.h = None
+            self.bands = list(range(self.image.bands))
+            if mask is not None:
+                mask = mask._instance if isinstance(mask, Image) else np.asarray(mask)
+                # one 2D mask for all statistics, masks made by new() have the shape (h, w, 1)
+                mask = mask.reshape(mask.shape[:2])
+                if mask.dtype != np.uint8:
+                    mask = (mask != 0).view(np.uint8)
+        elif isinstance(image_or_list, (list, tuple, np.ndarray)):
+            self.image = None
+            self.h = np.asarray(image_or_list, dtype=np.float64)
+            if self.h.size % 256:
+                raise ValueError("histogram of 256 values per band expected")
+            self.bands = list(range(self.h.size // 256))
+        else:
+            raise TypeError("first argument must be image or list")
+        self.mask = mask
+
+    def __getattr__(self, id):
+        "Calculate missing attribute"
+        if id[:4] == "_get":
+            raise AttributeError(id)
+        # calculate missing attribute
+        v = getattr(self, "_get" + id)()
+        setattr(self, id, v)
+        return v
+
+    def _gethistogram(self):
+        if self.h is not None:
+            return self.h
+        return np.asarray(self.image.histogram(self.mask), dtype=np.float64)
+
+    def _getextrema(self):
+        "Get min/max values for each band in the image"
+        if self.image is not None:
+            return _band_extrema(self.image._instance, self.mask)
+        extrema = []
+        for h in self.histogram.reshape(-1, 256):
+            used = np.flatnonzero(h)
+            extrema.append((int(used[0]), int(used[-1])) if used.size else (255, 0))
+        return extrema
+
+    def _getmeanstddev(self):
+        "Get (mean, stddev) of each band from a single cv2.meanStdDev"
+        if self.image is None:
+            values = np.arange(256)
+            mean = np.array([np.dot(h, values) / max(h.sum(), 1) for h in self.histogram.reshape(-1, 256)])
+            var = np.array([np.dot(h, values * values) / max(h.sum(), 1) for h in self.histogram.reshape(-1, 256)]) - mean * mean
+            return list(zip(mean.tolist(), np.sqrt(np.maximum(var, 0)).tolist()))
+        img = self.image._instance
+        if img.dtype == np.bool_:
+            img = img.view(np.uint8) * np.uint8(255)
+        mean, stddev = cv2.meanStdDev(img, mask=self.mask)
+        mean, stddev = mean.ravel().tolist(), stddev.ravel().tolist()
+        if len(mean) >= 3:
+            mean[0], mean[2] = mean[2], mean[0]
+            stddev[0], stddev[2] = stddev[2], stddev[0]
+        return list(zip(mean, stddev))
+
+    def _getcount(self):
+        "Get total number of pixels in each layer"
+        if self.image is None:
+            return [int(h.sum()) for h in self.histogram.reshape(-1, 256)]
+        if self.mask is None:
+            count = self.image.width * self.image.height
+        else:
+            count = cv2.countNonZero(self.mask)
+        return [count for i in self.bands]
+
+    def _getsum(self):
+        "Get sum of all pixels in each layer"
+        return [mean * count for (mean, stddev), count in zip(self.meanstddev, self.count)]
+
+    def _getsum2(self):
+        "Get squared sum of all pixels in each layer"
+        return [(stddev * stddev + mean * mean) * count for (mean, stddev), count in zip(self.meanstddev, self.count)]
+
+    def _getmean(self):
+        "Get average pixel level for each layer"
+        return [mean for mean, stddev in self.meanstddev]
+
+    def _getmedian(self):
+        "Get median pixel level for each layer"
+        if self.image is not None and self.image._instance.dtype not in (np.uint8, np.bool_):
+            img = self.image._instance
+            values = img if self.mask is None else img[self.mask != 0]
+            return [np.median(values).item()] if values.size else [0]
+        median = []
+        for h, count in zip(self.histogram.reshape(-1, 256), self.count):
+            median.append(int(np.searchsorted(np.cumsum(h), count // 2, side="right")))
+        return median
+
+    def _getrms(self):
+        "Get RMS for each layer"
+        return [np.sqrt(stddev * stddev + mean * mean) for mean, stddev in self.meanstddev]
+
+    def _getvar(self):
+        "Get variance for each layer"
+        return [stddev * stddev for mean, stddev in self.meanstddev]
+
+    def _getstddev(self):
+        "Get standard deviation for each layer"
+        return [stddev for mean, stddev in self.meanstddev]
 
 class Filter(object):
     pass
@@ -0,0 +1,12 @@
+import PILasOPENCV as Image
+# from PIL import Image
+
+background = Image.open("lena.jpg").convert("RGBA")
+layer = Image.new("RGBA", (200, 100), (255, 0, 0, 128))
+# the half transparent layer is composited over a region of the background in place
+background.alpha_composite(layer, dest=(50, 50))
+background.alpha_composite(layer, dest=(300, 300), source=(0, 0, 100, 100))
+background.show()
+im = Image.alpha_composite(Image.new("RGBA", (200, 100), (0, 0, 255, 255)), layer)
+print(im.getextrema())
+im.show()
@@ -0,0 +1,14 @@
+import PILasOPENCV as Image
+import PILasOPENCV as ImageChops
+# from PIL import Image, ImageChops
+
+im1 = Image.open("lena.jpg")
+im2 = im1.rotate(5)
+# frame differencing, the difference is written into the same image for every frame
+diff = Image.new("RGB", im1.size)
+for i in range(10):
+    ImageChops.difference(im1, im2, out=diff)
+diff.show()
+ImageChops.add(im1, im2, scale=2.0).show()
+ImageChops.screen(im1, im2).show()
+ImageChops.invert(im1).show()
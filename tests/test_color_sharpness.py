@@ -0,0 +1,12 @@
+# from PIL import Image, ImageEnhance
+import PILasOPENCV as Image
+import PILasOPENCV as ImageEnhance
+
+img = Image.open('lena.jpg')
+#
+enhancer = ImageEnhance.Color(img)
+for factor in (0.0, 0.5, 1.0, 1.5):
+    enhancer.enhance(factor).show()
+enhancer = ImageEnhance.Sharpness(img)
+for factor in (0.0, 1.0, 2.0):
+    enhancer.enhance(factor).show()
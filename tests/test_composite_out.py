@@ -0,0 +1,9 @@
+import PILasOPENCV as Image
+# from PIL import Image
+#
+img1 = Image.open('Images/cat.jpg')
+img2 = Image.open('Images/landscape.jpg').resize(img1.size)
+mask = Image.open('Images/mask1.jpg').convert("L").resize(img1.size)
+# the result is written into img2, no new image is allocated
+Image.composite(img1, img2, mask, out=img2)
+img2.show()
@@ -0,0 +1,20 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+import PILasOPENCV as ImageChops
+# from PIL import Image, ImageChops
+
+im = Image.open("lena.jpg")
+for mode in ("CMYK", "LAB", "HSV", "YCbCr"):
+    converted = im.convert(mode)
+    back = converted.convert("RGB")
+    # the round trip loses at most a few levels to rounding
+    print(converted.mode, converted.getbands(), back.mode, ImageChops.difference(back, im).getextrema())
+hsv = im.convert("LAB").convert("HSV")
+print(hsv.mode, ImageChops.difference(hsv.convert("RGB"), im).getextrema())
+gray = im.convert("YCbCr").convert("L")
+print(gray.mode, ImageChops.difference(gray, im.convert("L")).getextrema())
+bilevel = im.convert("1")
+# the bilevel image is black and white, it converts back to 0 and 255 values
+print(bilevel.mode, bilevel.convert("L").getcolors(), bilevel.convert("RGB").convert("1").mode)
+blank = Image.new("1", (10, 10))
+print(blank.convert("RGB").mode, blank.convert("L").getextrema(), Image.new("L", (10, 10), 255).convert("1").mode)
@@ -0,0 +1,14 @@
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+# crop and copy share the pixels with the image until one of them is changed
+part = im.crop((100, 100, 300, 300))
+duplicate = im.copy()
+part.paste(Image.new("RGB", (50, 50), (255, 0, 0)), (0, 0))
+draw = Image.Draw(duplicate)
+draw.rectangle((0, 0, 100, 100), fill=(0, 255, 0))
+# the original image is unchanged
+im.show()
+part.show()
+duplicate.show()
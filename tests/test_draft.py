@@ -0,0 +1,19 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("Images/plane.jpg")
+print(im.format, im.size, im.mode)
+# decodes the jpeg at a quarter of its resolution
+im.draft("RGB", (200, 150))
+print(im.size, im.mode)
+im.show()
+
+im = Image.open("Images/plane.jpg")
+im.draft("L", im.size)
+im.show()
+
+im = Image.open("Images/plane.jpg")
+im.thumbnail((128, 128))
+print(im.size, im.mode)
+im.show()
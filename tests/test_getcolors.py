@@ -0,0 +1,12 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+# a photo has more than 256 colors
+print(im.getcolors())
+colors = im.getcolors(maxcolors=im.size[0]*im.size[1])
+print(len(colors), "colors, the most frequent:", max(colors))
+gray = im.convert("L")
+print(gray.getcolors()[:10])
+print(gray.histogram()[:10])
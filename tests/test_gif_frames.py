@@ -0,0 +1,15 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# from PIL import Image
+import time
+
+t = time.time()
+im = Image.open("Images/Rotating_earth.gif")
+print("opened in %.3f s" % (time.time()-t))
+print("frames:", im.n_frames, "animated:", im.is_animated)
+# frames are decoded only when they are accessed
+for frame in (10, 11, 43, 0):
+    t = time.time()
+    im.seek(frame)
+    print("frame", im.tell(), "decoded in %.3f s" % (time.time()-t))
+im.show()
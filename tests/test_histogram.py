@@ -0,0 +1,16 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+# 256 bins per band in the order R, G, B
+hist = im.histogram()
+print(len(hist), sum(hist) == 3 * im.size[0] * im.size[1])
+# only the pixels where the mask is not zero are counted
+mask = Image.new("L", im.size, 0)
+mask.paste(Image.new("L", (100, 100), 255), (0, 0))
+print(sum(im.convert("L").histogram(mask)))
+# I and F images are binned between their extrema
+for mode in ("I", "F"):
+    converted = im.convert(mode)
+    print(mode, sum(converted.histogram()), sum(converted.histogram(mask)), sum(converted.histogram(Image.new("L", im.size, 255))))
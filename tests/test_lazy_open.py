@@ -0,0 +1,14 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# from PIL import Image
+
+# only the header of the files is read, the pixels are decoded on first access
+images = "lena.jpg", "Images/audrey.png", "Images/mask1.jpg", "Images/plane.jpg"
+for image in images:
+    im = Image.open(image)
+    print(image, im.format, im.size, im.mode)
+    if im.size[0] < 300:
+        print("skipped, too small")
+        continue
+    im.load()
+    print(type(im.getim()), im.getim().shape)
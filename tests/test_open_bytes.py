@@ -0,0 +1,12 @@
+from __future__ import print_function
+import io
+import PILasOPENCV as Image
+# from PIL import Image
+
+with open("lena.jpg", "rb") as f:
+    data = f.read()
+# the encoded image is wrapped without copying it
+for source in (data, bytearray(data), memoryview(data), io.BytesIO(data)):
+    im = Image.open(source)
+    print(type(source).__name__, im.format, im.size, im.mode)
+im.show()
@@ -0,0 +1,13 @@
+from __future__ import print_function
+import PILasOPENCV as Image
+# there is no batch loader in PIL
+
+images = ["lena.jpg", "Images/cat.jpg", "Images/landscape.jpg", "Images/plane.jpg", "Images/missing.jpg"]
+for index, im in Image.open_many(images, workers=4):
+    if isinstance(im, Exception):
+        print(images[index], "failed:", im)
+    else:
+        print(images[index], im.format, im.size, im.mode)
+
+for index, im in Image.open_many(images, workers=4, ordered=False):
+    print("decoded", images[index])
@@ -0,0 +1,15 @@
+import PILasOPENCV as Image
+# from PIL import Image
+
+# crop and resize while decoding, the jpeg is decoded at a reduced resolution
+im = Image.open("lena.jpg", box=(100, 100, 400, 400), size=(64, 64))
+print(im.size, im.mode)
+im.show()
+# same as
+im2 = Image.open("lena.jpg").crop((100, 100, 400, 400)).resize((64, 64), Image.INTERAREA)
+print(im2.size, im2.mode)
+im2.show()
+# the part of a box outside the image is black like with crop() in PIL
+im3 = Image.open("lena.jpg", box=(256, 256, 768, 768), size=(128, 128))
+print(im3.size, im3.getbbox())
+im3.show()
@@ -0,0 +1,15 @@
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+# the results are written to an existing image instead of a new one
+small = Image.new("RGB", (256, 256))
+im.resize((256, 256), out=small)
+small.show()
+gray = Image.new("L", im.size)
+im.convert("L", out=gray)
+gray.show()
+# flips and filters can work on the image itself
+im.transpose(Image.FLIP_LEFT_RIGHT, out=im)
+im.filter(Image.BLUR, out=im)
+im.show()
@@ -0,0 +1,15 @@
+from __future__ import print_function
+import io
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+for quality in (10, 50, 90):
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    print("JPEG quality", quality, len(buf.getvalue()), "bytes")
+buf = io.BytesIO()
+im.save(buf, format="PNG", optimize=True)
+print("PNG", len(buf.getvalue()), "bytes")
+buf.seek(0)
+Image.open(buf).show()
@@ -0,0 +1,16 @@
+import PILasOPENCV as Image
+# from PIL import Image
+
+im = Image.open("lena.jpg")
+im = im.resize((256, 256))
+
+def frames(count):
+    # the frames are generated one at a time and written as they arrive
+    for i in range(1, count):
+        yield im.rotate(i*360//count)
+
+im.save("lena_rotating.gif", save_all=True, append_images=frames(36), duration=40, loop=0)
+gif = Image.open("lena_rotating.gif")
+print("frames:", gif.n_frames)
+gif.seek(9)
+gif.show()
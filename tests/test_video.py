@@ -0,0 +1,19 @@
+import PILasOPENCV as Image
+# from PIL import Image
+import cv2
+
+# write a short video to read it back as image sequence
+lena = cv2.imread("lena.jpg")
+writer = cv2.VideoWriter("lena.avi", cv2.VideoWriter_fourcc(*"MJPG"), 25, (lena.shape[1], lena.shape[0]))
+for i in range(50):
+    writer.write(cv2.flip(lena, 1) if i % 2 else lena)
+writer.release()
+
+im = Image.open("lena.avi")
+print(im.format, im.size, im.mode, "frames:", im.n_frames, im.image_specs)
+# frames read in order are streamed, seeking jumps to a frame
+for frame in range(im.n_frames):
+    im.seek(frame)
+im.seek(7)
+print("frame", im.tell())
+im.show()